@@ -10,6 +10,7 @@ import misc
 import libmysql
 import config
 import crontab
+import eventqueue
 import cmd, sys
 import govtypes
 import random 
@@ -22,7 +23,7 @@ from classes import Proposal, Superblock
 from dashd import CTransaction
 
 # Enable only for testing:
-crontab.CONFIRMATIONS_REQUIRED = 1
+eventqueue.CONFIRMATIONS_REQUIRED = 1
 
 parent = GovernanceObject()
 parent.init()
@@ -0,0 +1,36 @@
+/*
+  Indexes for the queries run by sentineld and scripts/crontab.py
+
+  governance_object
+    idx_origin_hash            existence / vote count sync by object_hash, covers
+                               the startup load of the remote object index
+    idx_origin_status_valid    AutoVoteTask invalid objects and valid superblocks
+    idx_origin_status_votes    CreateSuperblockTask ranked proposals
+
+  superblock
+    idx_event_block_height     local superblock lookup by event_block_height
+
+  event
+    idx_pending                events waiting to be prepared or submitted
+
+  The indexed varchar columns are narrowed to what they hold (hex sha256
+  hashes, LOCAL/REMOTE, NEW/VOTED/SUBMITTED) first.  At varchar(255) in
+  utf8 a key part takes 767 bytes, at the limit of InnoDB on MySQL 5.6
+  with the default row format, and whole keys get over 1.5kB.
+*/
+
+ALTER TABLE `governance_object`
+  MODIFY `object_hash` varchar(64) NOT NULL DEFAULT '',
+  MODIFY `object_status` varchar(32) NOT NULL DEFAULT '',
+  MODIFY `object_origin` varchar(16) NOT NULL DEFAULT '';
+
+ALTER TABLE `governance_object`
+  ADD INDEX `idx_origin_hash` (`object_origin`, `object_hash`, `absolute_yes_count`, `yes_count`, `no_count`),
+  ADD INDEX `idx_origin_status_valid` (`object_origin`, `object_status`, `is_valid`, `object_type`),
+  ADD INDEX `idx_origin_status_votes` (`object_origin`, `object_status`, `is_valid`, `absolute_yes_count`);
+
+ALTER TABLE `superblock`
+  ADD INDEX `idx_event_block_height` (`event_block_height`);
+
+ALTER TABLE `event`
+  ADD INDEX `idx_pending` (`submit_time`, `error_time`, `prepare_time`, `start_time`);
@@ -0,0 +1,17 @@
+/*
+  Lease columns for the event queue (lib/eventqueue.py)
+
+  event
+    claim_token          token of the worker holding the event, '' when free
+    lease_expires        epoch after which another worker may claim it
+    attempts             failed attempts of the current step
+    next_attempt_time    epoch before which the event isn't retried
+    idx_claim_token      loading and releasing the events of a claim
+*/
+
+ALTER TABLE `event`
+  ADD COLUMN `claim_token` varchar(32) NOT NULL DEFAULT '',
+  ADD COLUMN `lease_expires` int(11) NOT NULL DEFAULT '0',
+  ADD COLUMN `attempts` int(11) NOT NULL DEFAULT '0',
+  ADD COLUMN `next_attempt_time` int(11) NOT NULL DEFAULT '0',
+  ADD INDEX `idx_claim_token` (`claim_token`);
@@ -0,0 +1,18 @@
+/*
+  Confirmation tracking for event submission (lib/eventqueue.py)
+
+  event
+    fee_tx_height      block the fee transaction was mined in, 0 until it's known
+    maturity_height    block from which the object can be submitted, projected
+                       from the preparation height until fee_tx_height is known
+    idx_pending        rebuilt over every column the eventqueue.claim() queries
+                       filter on, the ones added by 003 and here included, so
+                       the lease and maturity conditions are checked in the index
+*/
+
+ALTER TABLE `event`
+  ADD COLUMN `fee_tx_height` int(11) NOT NULL DEFAULT '0',
+  ADD COLUMN `maturity_height` int(11) NOT NULL DEFAULT '0',
+  DROP INDEX `idx_pending`,
+  ADD INDEX `idx_pending` (`submit_time`, `error_time`, `prepare_time`, `maturity_height`,
+                           `next_attempt_time`, `lease_expires`, `start_time`);
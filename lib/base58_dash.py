@@ -2,9 +2,20 @@
 Bitcoin base58 encoding and decoding.
 
 Based on https://bitcointalk.org/index.php?topic=1026.0 (public domain)
+
+Conversions between bytes and integers go through hex (or int.from_bytes
+on Python 3) and digits are appended then reversed, so encoding and
+decoding don't rebuild strings for every character.  When gmpy2 is
+installed the base 58 digit conversion is done by GMP.
 '''
+import binascii
 import hashlib
 
+try:
+    import gmpy2
+except ImportError:
+    gmpy2 = None
+
 # for compatibility with following code...
 class SHA256:
     new = hashlib.sha256
@@ -20,47 +31,78 @@ __b58chars = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
 __b58base = len(__b58chars)
 b58chars = __b58chars
 
+# character -> digit value, for decoding
+__b58values = dict((c, i) for (i, c) in enumerate(__b58chars))
+__b58charset = frozenset(__b58chars)
+
+# gmpy2 writes and reads base 58 numbers with these digits
+__gmpy_digits = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuv'
+if str != bytes:
+    __to_b58 = str.maketrans(__gmpy_digits, __b58chars)
+    __from_b58 = str.maketrans(__b58chars, __gmpy_digits)
+else:
+    import string
+    __to_b58 = string.maketrans(__gmpy_digits, __b58chars)
+    __from_b58 = string.maketrans(__b58chars, __gmpy_digits)
+
+if hasattr(int, 'from_bytes'):
+    def bytes_to_int(v):
+        return int.from_bytes(v, 'big')
+
+    def int_to_bytes(n):
+        """ big endian bytes of n, at least one byte """
+        return n.to_bytes(max(1, (n.bit_length() + 7) // 8), 'big')
+else:
+    def bytes_to_int(v):
+        if len(v) == 0:
+            return 0
+        return int(binascii.hexlify(v), 16)
+
+    def int_to_bytes(n):
+        """ big endian bytes of n, at least one byte """
+        h = '%x' % n
+        if len(h) % 2:
+            h = '0' + h
+        return binascii.unhexlify(h)
+
 def b58encode(v):
     """ encode v, which is a string of bytes, to base58.
     """
-    long_value = 0
-    for (i, c) in enumerate(v[::-1]):
-        long_value += (256**i) * ord(c)
+    long_value = bytes_to_int(v)
 
-    result = ''
-    while long_value >= __b58base:
-        div, mod = divmod(long_value, __b58base)
-        result = __b58chars[mod] + result
-        long_value = div
-    result = __b58chars[long_value] + result
+    if gmpy2 is not None:
+        result = gmpy2.mpz(long_value).digits(__b58base).translate(__to_b58)
+    else:
+        digits = []
+        while long_value >= __b58base:
+            long_value, mod = divmod(long_value, __b58base)
+            digits.append(__b58chars[mod])
+        digits.append(__b58chars[long_value])
+        digits.reverse()
+        result = ''.join(digits)
 
     # Bitcoin does a little leading-zero-compression:
     # leading 0-bytes in the input become leading-1s
-    nPad = 0
-    for c in v:
-        if c == '\0': nPad += 1
-        else: break
+    nPad = len(v) - len(v.lstrip(b'\0'))
 
     return (__b58chars[0]*nPad) + result
 
 def b58decode(v, length = None):
     """ decode v into a string of len bytes
     """
-    long_value = 0
-    for (i, c) in enumerate(v[::-1]):
-        long_value += __b58chars.find(c) * (__b58base**i)
-
-    result = bytes()
-    while long_value >= 256:
-        div, mod = divmod(long_value, 256)
-        result = chr(mod) + result
-        long_value = div
-    result = chr(long_value) + result
-
-    nPad = 0
-    for c in v:
-        if c == __b58chars[0]: nPad += 1
-        else: break
+    if not __b58charset.issuperset(v):
+        return None
+
+    if gmpy2 is not None and len(v) > 0:
+        long_value = int(gmpy2.mpz(v.translate(__from_b58), __b58base))
+    else:
+        long_value = 0
+        for c in v:
+            long_value = long_value * __b58base + __b58values[c]
+
+    result = int_to_bytes(long_value)
+
+    nPad = len(v) - len(v.lstrip(__b58chars[0]))
 
     result = chr(0)*nPad + result
     if length is not None and len(result) != length:
@@ -81,7 +123,6 @@ def b58decode_chk(v):
     result = b58decode(v)
     if result is None:
         return None
-    h3 = checksum(result[:-4])
     if result[-4:] == checksum(result[:-4]):
         return result[:-4]
     else:
@@ -101,4 +142,11 @@ if __name__ == '__main__':
     _tmp = b58encode(_ohai)
     assert _tmp == 'DYB3oMS'
     assert b58decode(_tmp, 5) == _ohai
+    # round trips, with leading zero bytes
+    import random
+    _rng = random.Random(0)
+    for _n in (1, 2, 21, 25, 100):
+        for _zeros in (0, 1, 3):
+            _v = chr(0)*_zeros + chr(_rng.randint(1, 255)) + b''.join(chr(_rng.randint(0, 255)) for _j in range(_n - 1))
+            assert b58decode(b58encode(_v)) == _v
     print("Tests passed")
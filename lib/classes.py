@@ -50,16 +50,16 @@ class Proposal:
                 payment_address,
                 payment_amount
             from proposal where 
-                id = %s """ % record_id
+                id = %s """
 
-        libmysql.db.query(sql)
-        res = libmysql.db.store_result()
-        row = res.fetch_row()
+        c = libmysql.execute(sql, (record_id,))
+        row = c.fetchone()
+        c.close()
         if row:
-            print row[0]
+            print row
             ( self.proposal["governance_object_id"], self.proposal["proposal_name"], 
                 self.proposal["start_epoch"], self.proposal["end_epoch"], 
-                self.proposal["payment_address"], self.proposal["payment_amount"]) = row[0]
+                self.proposal["payment_address"], self.proposal["payment_amount"]) = row
             print "loaded proposal successfully"
 
             return True
@@ -81,9 +81,9 @@ class Proposal:
                 payment_amount=%(payment_amount)s
         """
 
-        print sql % self.proposal
+        print sql
 
-        libmysql.db.query(sql % self.proposal)
+        libmysql.execute(sql, self.proposal).close()
 
     def set_field(self, name, value):
         self.proposal[name] = value 
@@ -144,15 +144,15 @@ class Superblock():
                 payment_addresses,
                 payment_amounts
             from superblock where 
-                id = %s """ % record_id
+                id = %s """
 
-        libmysql.db.query(sql)
-        res = libmysql.db.store_result()
-        row = res.fetch_row()
+        c = libmysql.execute(sql, (record_id,))
+        row = c.fetchone()
+        c.close()
         if row:
-            print row[0]
+            print row
             ( self.trigger["governance_object_id"], self.trigger["superblock_name"], 
-                self.trigger["event_block_height"], self.trigger["payment_addresses"], self.trigger["payment_amounts"]) = row[0]
+                self.trigger["event_block_height"], self.trigger["payment_addresses"], self.trigger["payment_amounts"]) = row
 
             print "loaded trigger successfully"
 
@@ -167,26 +167,26 @@ class Superblock():
         if self.loaded:
             sql = """
                      UPDATE superblock SET
-                            governance_object_id="%(governance_object_id)s",
-                            superblock_name="%(superblock_name)s",
-                            event_block_height="%(event_block_height)s",
-                            payment_addresses="%(payment_addresses)s",
-                            payment_amounts="%(payment_amounts)s"
-                     WHERE  governance_object_id="%(governance_object_id)s"
+                            governance_object_id=%(governance_object_id)s,
+                            superblock_name=%(superblock_name)s,
+                            event_block_height=%(event_block_height)s,
+                            payment_addresses=%(payment_addresses)s,
+                            payment_amounts=%(payment_amounts)s
+                     WHERE  governance_object_id=%(governance_object_id)s
             """
         else:
             sql = """
                      INSERT INTO superblock
                                  (governance_object_id,superblock_name,event_block_height,payment_addresses,payment_amounts)
                      VALUES
-                                 ("%(governance_object_id)s","%(superblock_name)s","%(event_block_height)s","%(payment_addresses)s","%(payment_amounts)s")
+                                 (%(governance_object_id)s,%(superblock_name)s,%(event_block_height)s,%(payment_addresses)s,%(payment_amounts)s)
             """
 
         print self.trigger
 
-        print sql % self.trigger
+        print sql
 
-        libmysql.db.query(sql % self.trigger)
+        libmysql.execute(sql, self.trigger).close()
 
     def set_field(self, name, value):
         self.trigger[name] = value 
@@ -4,6 +4,21 @@
 Dashd interface
 ----
 
+    Two transports are available, selected by config.dashd_transport:
+
+    - "rpc" (default) : JSON-RPC over a kept-alive HTTP connection to
+      dashd's RPC port, with credentials read from datadir/dash.conf
+    - "cli"           : spawns dash-cli (config.dashd_path) for each call
+
+    rpc_call() returns parsed Python objects and raises RPCError on
+    failure. rpc_batch() sends many calls in one JSON-RPC batch and
+    returns a (result, error) pair per call. rpc_stream() is for calls
+    returning a large object (gobject list, masternodelist full): it
+    parses the reply as it arrives and yields its (key, value) members
+    one at a time, so the whole reply is never held in memory.
+    rpc_command() keeps the old dash-cli style interface: it takes a
+    command line string and returns the text dash-cli would print.
+
 """
 
 import os
@@ -11,50 +26,530 @@ import config
 import subprocess
 import json
 import sys
+import shlex
+import socket
+import base64
+import errno
+import httplib
+import re
+import threading
 
-def rpc_command(params):
+DEFAULT_RPC_HOST = "127.0.0.1"
+DEFAULT_RPC_PORT = 9998
+DEFAULT_TESTNET_RPC_PORT = 19998
+RPC_TIMEOUT_SECONDS = 300
+
+# Maximum number of calls sent in a single JSON-RPC batch request
+RPC_BATCH_SIZE = 1000
+
+# Bytes read from the transport at a time by rpc_stream
+RPC_STREAM_CHUNK_SIZE = 65536
+
+# Positional parameters which dash-cli converts from strings to JSON
+# values before sending them to dashd.  Command line style calls made
+# through rpc_command need the same conversion to produce the same request.
+RPC_CONVERT_PARAMS = {
+    "getblockhash" : [0],
+    "getblock" : [1],
+    "getrawtransaction" : [1],
+    "gettransaction" : [1],
+}
+
+class RPCError(Exception):
+
+    def __init__(self, code, message):
+        Exception.__init__(self, "%s (code %s)" % (message, code))
+        self.code = code
+        self.message = message
+
+    def to_cli_text(self):
+        """ text printed by dash-cli for this error """
+        return "error: " + json.dumps({"code" : self.code, "message" : self.message}) + "\n"
+
+def read_dash_conf(datadir):
+    """ parse datadir/dash.conf into a dictionary, later values win """
+    conf = {}
+    path = os.path.join(datadir, "dash.conf")
+    if not os.path.exists(path):
+        return conf
+    with open(path) as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if "=" not in line:
+                continue
+            key, value = line.split("=", 1)
+            conf[key.strip()] = value.strip()
+    return conf
+
+def read_rpc_cookie(datadir, testnet):
+    """ returns (user, password) from dashd's .cookie file, if present """
+    if testnet:
+        datadir = os.path.join(datadir, "testnet3")
+    path = os.path.join(datadir, ".cookie")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        user, password = f.read().strip().split(":", 1)
+    return (user, password)
+
+def is_dropped_connection(e):
+    """ True if e says the server closed the connection without answering the request """
+    if isinstance(e, httplib.BadStatusLine):
+        return True
+    if isinstance(e, socket.timeout):
+        return False
+    return isinstance(e, socket.error) and e.errno in (errno.ECONNRESET, errno.EPIPE, errno.ECONNABORTED)
+
+class RPCClient():
+
+    """ JSON-RPC client holding a single kept-alive HTTP connection to dashd """
+
+    def __init__(self, host, port, user, password, timeout = RPC_TIMEOUT_SECONDS):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.auth = "Basic " + base64.b64encode("%s:%s" % (user, password))
+        self.conn = None
+        self.next_id = 0
+        # method of the stream whose response is being read, the
+        # connection can't carry another request until it's done
+        self.streaming = None
+
+    @staticmethod
+    def from_datadir(datadir):
+        conf = read_dash_conf(datadir)
+        testnet = conf.get("testnet", "0") == "1"
+        port = DEFAULT_TESTNET_RPC_PORT if testnet else DEFAULT_RPC_PORT
+        port = int(conf.get("rpcport", port))
+        host = conf.get("rpcconnect", DEFAULT_RPC_HOST)
+        user = conf.get("rpcuser")
+        password = conf.get("rpcpassword")
+        if user is None or password is None:
+            cookie = read_rpc_cookie(datadir, testnet)
+            if cookie is None:
+                raise RPCError(-1, "no rpcuser/rpcpassword in %s/dash.conf and no .cookie file" % datadir)
+            user, password = cookie
+        return RPCClient(host, port, user, password)
+
+    def connect(self):
+        self.close()
+        self.conn = httplib.HTTPConnection(self.host, self.port, timeout = self.timeout)
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def send(self, payload):
+        """ POST a JSON payload, returns the response with its body still unread """
+        if self.streaming is not None:
+            raise RPCError(-1, "connection is busy streaming %s, use another client" % self.streaming)
+        body = json.dumps(payload)
+        headers = {
+            "Host" : self.host,
+            "Authorization" : self.auth,
+            "Content-Type" : "application/json",
+            "Connection" : "keep-alive",
+        }
+        # A kept-alive connection may have been closed by dashd since the
+        # last request, the request then fails before any response and is
+        # retried once on a fresh connection.  Any other failure, a timeout
+        # in particular, may come after dashd ran the call and isn't
+        # retried: gobject prepare would pay its fee twice.
+        while True:
+            reused = self.conn is not None
+            if not reused:
+                self.connect()
+            try:
+                self.conn.request("POST", "/", body, headers)
+                response = self.conn.getresponse()
+                break
+            except (httplib.HTTPException, socket.error) as e:
+                self.close()
+                if not (reused and is_dropped_connection(e)):
+                    raise RPCError(-1, "couldn't connect to server: %s" % e)
+        if response.status == 401:
+            self.read(response)
+            raise RPCError(-1, "incorrect rpcuser or rpcpassword (authorization failed)")
+        return response
+
+    def read(self, response, size = None):
+        """ read the response body, or the next size bytes of it """
+        try:
+            if size is None:
+                data = response.read()
+            else:
+                data = response.read(size)
+        except (httplib.HTTPException, socket.error) as e:
+            self.close()
+            raise RPCError(-1, "connection to server lost: %s" % e)
+        if response.isclosed() and response.getheader("connection", "").lower() == "close":
+            self.close()
+        return data
+
+    def request(self, payload):
+        """ POST a JSON payload and return the parsed response body """
+        response = self.send(payload)
+        data = self.read(response)
+        try:
+            return json.loads(data)
+        except ValueError:
+            raise RPCError(-1, "invalid response from server (HTTP %d): %s" % (response.status, data[:200]))
+
+    def call(self, method, *params):
+        self.next_id += 1
+        reply = self.request({"method" : method, "params" : list(params), "id" : self.next_id})
+        error = reply.get("error")
+        if error is not None:
+            raise RPCError(error.get("code"), error.get("message"))
+        return reply.get("result")
+
+    def stream(self, method, *params):
+        """ call a method returning an object, yields its (key, value) members as they arrive """
+        self.next_id += 1
+        response = self.send({"method" : method, "params" : list(params), "id" : self.next_id})
+        self.streaming = method
+        complete = False
+        try:
+            chunks = iter(lambda: self.read(response, RPC_STREAM_CHUNK_SIZE), "")
+            for member in iter_result_members(JSONStream(chunks), method):
+                yield member
+            # drain what's left so the connection can be reused
+            self.read(response)
+            complete = True
+        finally:
+            self.streaming = None
+            if not complete:
+                # abandoned or failed part way through the body
+                self.close()
+
+    def batch(self, calls):
+        """ send [(method, params), ...] as one batch, returns [(result, error), ...] in call order """
+        if len(calls) == 0:
+            return []
+        payload = []
+        for method, params in calls:
+            self.next_id += 1
+            payload.append({"method" : method, "params" : list(params), "id" : self.next_id})
+        replies = self.request(payload)
+        if isinstance(replies, dict):
+            # dashd rejected the batch as a whole
+            error = replies.get("error") or {}
+            raise RPCError(error.get("code"), error.get("message"))
+        replies_by_id = dict((reply.get("id"), reply) for reply in replies)
+        results = []
+        for request in payload:
+            reply = replies_by_id.get(request["id"])
+            if reply is None:
+                results.append((None, RPCError(-1, "no reply for %s" % request["method"])))
+            elif reply.get("error") is not None:
+                error = reply["error"]
+                results.append((None, RPCError(error.get("code"), error.get("message"))))
+            else:
+                results.append((reply.get("result"), None))
+        return results
+
+# an HTTPConnection can't be shared between threads, so each thread
+# which talks to dashd gets its own client
+local = threading.local()
+
+def get_client():
+    client = getattr(local, "client", None)
+    if client is None:
+        client = RPCClient.from_datadir(config.datadir)
+        local.client = client
+    return client
+
+def use_cli():
+    return getattr(config, "dashd_transport", "rpc") == "cli"
+
+def cli_run(params):
+    """ run dash-cli with a command line, returns (stdout, stderr, returncode)
+
+        communicate() reads both pipes in large blocks until EOF, so
+        capturing big outputs is linear and error text printed on stderr
+        never ends up in the JSON printed on stdout.
+    """
+    dashcmd = config.dashd_path + " --datadir=" + config.datadir
+    proc = subprocess.Popen(dashcmd + " " + params, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    out, err = proc.communicate()
+    return out, err, proc.returncode
+
+def cli_command(params):
+    """ run dash-cli, returns what it printed: its output, or its error text if it failed """
+    out, err, returncode = cli_run(params)
+    if returncode != 0 and out == "":
+        return err
+    return out
+
+def cli_stream(method, params):
+    """ run dash-cli, yields the (key, value) members of the object it prints as they arrive """
+    args = method + " " + " ".join(quote_cli_param(p) for p in params)
     dashcmd = config.dashd_path + " --datadir=" + config.datadir
-    
-    #print "'%s' '%s'" % (dashcmd, params)
+    proc = subprocess.Popen(dashcmd + " " + args, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        stream = JSONStream(iter(lambda: proc.stdout.read(RPC_STREAM_CHUNK_SIZE), ""))
+        if stream.peek() != "{":
+            # dash-cli prints errors on stderr
+            raise parse_cli_error(proc.stderr.read(), method)
+        for member in stream.iter_object():
+            yield member
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+        proc.stdout.close()
+        proc.stderr.close()
+        proc.wait()
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+class JSONStream():
+
+    """ incremental reader of a JSON document arriving as a sequence of chunks
+
+        Only the unconsumed tail of the input is buffered: values are
+        decoded one at a time with raw_decode, and a value which is cut
+        by the end of the buffer is retried once the next chunk is in.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.decoder = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """ append the next chunk to the buffer, returns False at the end of the input """
+        if self.eof:
+            return False
+        chunk = next(self.chunks, "")
+        if chunk == "":
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """ next character after whitespace, "" at the end of the input """
+        while True:
+            self.pos = WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError("expected %r, found %r" % (char, found))
+        self.pos += 1
+
+    def read_value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # a number at the end of the buffer may continue in the next chunk
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except ValueError:
+                if self.eof:
+                    raise
+            self.fill()
+
+    def next_key(self, first):
+        """ read the next member name of an object and its ':', None at the closing brace """
+        if self.peek() == "}":
+            self.pos += 1
+            return None
+        if not first:
+            self.expect(",")
+        key = self.read_value()
+        self.expect(":")
+        return key
+
+    def iter_object(self):
+        """ yields the (key, value) members of the object at the current position """
+        self.expect("{")
+        first = True
+        while True:
+            key = self.next_key(first)
+            if key is None:
+                return
+            first = False
+            yield key, self.read_value()
+
+def iter_result_members(stream, method):
+    """ yields the members of the result object of a streamed JSON-RPC response """
+    try:
+        stream.expect("{")
+        first = True
+        while True:
+            key = stream.next_key(first)
+            if key is None:
+                return
+            first = False
+            if key == "result" and stream.peek() == "{":
+                for member in stream.iter_object():
+                    yield member
+                continue
+            value = stream.read_value()
+            if key == "error" and value is not None:
+                raise RPCError(value.get("code"), value.get("message"))
+            if key == "result" and value is not None:
+                raise RPCError(-1, "%s didn't return an object" % method)
+    except ValueError as e:
+        raise RPCError(-1, "invalid response from server: %s" % e)
+
+def quote_cli_param(param):
+    return "'%s'" % str(param).replace("'", "'\\''")
+
+def parse_cli_error(output, method):
+    """ RPCError for the error text printed by dash-cli """
+    if output.startswith("error: "):
+        try:
+            error = json.loads(output[len("error: "):])
+            return RPCError(error.get("code"), error.get("message"))
+        except ValueError:
+            pass
+    if output.strip() == "":
+        return RPCError(-1, "%s didn't return an object" % method)
+    return RPCError(-1, output.strip())
+
+def convert_params(method, args):
+    """ convert command line arguments the same way dash-cli does """
+    convert = RPC_CONVERT_PARAMS.get(method, [])
+    params = []
+    for i, arg in enumerate(args):
+        if i in convert:
+            arg = json.loads(arg)
+        params.append(arg)
+    return params
+
+def format_result(result):
+    """ render an rpc result the way dash-cli prints it """
+    if result is None:
+        return ""
+    if isinstance(result, basestring):
+        return result + "\n"
+    return json.dumps(result, indent=2, separators=(",", ": ")) + "\n"
+
+def rpc_call(method, *params):
+    """ call an rpc method and return the parsed result, raises RPCError """
+    if not use_cli():
+        return get_client().call(method, *params)
+
+    args = " ".join([method] + [quote_cli_param(p) for p in params])
+    out, err, returncode = cli_run(args)
+    if returncode != 0:
+        if err.strip() == "":
+            raise RPCError(-1, "dash-cli exited with status %d" % returncode)
+        raise parse_cli_error(err, method)
+    # the captured output is decoded as is, without further copies
+    try:
+        return json.loads(out)
+    except ValueError:
+        return out.strip()
+
+def rpc_stream(method, *params):
+    """ call a method returning an object, yields its (key, value) members
+        as they are received, raises RPCError
+    """
+    if use_cli():
+        return cli_stream(method, params)
+    return client_stream(method, params)
+
+def client_stream(method, params):
+    """ streams on a connection of its own, closed when the stream ends
+
+        The caller usually does work between members which makes other rpc
+        calls, those go through the thread's client while the stream's
+        response is still being read.
+    """
+    client = RPCClient.from_datadir(config.datadir)
+    try:
+        for member in client.stream(method, *params):
+            yield member
+    finally:
+        client.close()
+
+def rpc_batch(calls, batch_size = RPC_BATCH_SIZE):
+    """ run [(method, params), ...] in as few round trips as possible,
+        returns [(result, error), ...] in call order, error is an RPCError or None
 
-    proc = subprocess.Popen(dashcmd + " " + params, shell=True, bufsize=1, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
-    output = ""
-    while (True):
-        # Read line from stdout, break if EOF reached, append line to output
-        line = proc.stdout.readline()
-        line = line.decode()
-        if (line == ""): break
-        output += line
+        A request which fails as a whole fails each of its calls only, the
+        results of the requests before it are kept: those calls have run.
+    """
+    if use_cli():
+        results = []
+        for method, params in calls:
+            try:
+                results.append((rpc_call(method, *params), None))
+            except RPCError as e:
+                results.append((None, e))
+        return results
 
-    return output
+    results = []
+    for i in range(0, len(calls), batch_size):
+        batch = calls[i:i + batch_size]
+        try:
+            results.extend(get_client().batch(batch))
+        except RPCError as e:
+            results.extend([(None, e)] * len(batch))
+    return results
+
+def rpc_command(params):
+    """ run a dash-cli style command line, returns the text dash-cli would print """
+    if use_cli():
+        return cli_command(params)
+
+    args = shlex.split(params)
+    try:
+        result = get_client().call(args[0], *convert_params(args[0], args[1:]))
+    except RPCError as e:
+        return e.to_cli_text()
+    return format_result(result)
 
 class CTransaction():
     tx = {}
 
     def __init__(self):
-        tx = {
+        self.tx = {
             "bcconfirmations" : 0
         }
-        return None
 
     def load(self, txid):
-        result = rpc_command("gettransaction " + txid)
-
         try:
-            obj = json.loads(result)
-            if obj:
-                self.tx = obj
-                return True
-            else: 
-                print "error loading tx"
-                return False
-        except:
-            print "Unexpected error:", sys.exc_info()[0]
-            print 
-            print "dashd result:", result
-            print
+            obj = rpc_call("gettransaction", txid)
+        except RPCError as e:
+            print "error loading tx:", e
+            return False
+
+        if obj:
+            self.tx = obj
+            return True
+        else:
+            print "error loading tx"
             return False
 
+    @staticmethod
+    def load_many(txids):
+        """ load several transactions in one batch, returns { txid : CTransaction or None } """
+        txs = {}
+        results = rpc_batch([("gettransaction", [txid]) for txid in txids])
+        for txid, (obj, error) in zip(txids, results):
+            if error is not None or not obj:
+                print "error loading tx %s: %s" % (txid, error)
+                txs[txid] = None
+                continue
+            tx = CTransaction()
+            tx.tx = obj
+            txs[txid] = tx
+        return txs
+
     def get_hash(self):
         return None
 
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+
+"""
+Superblock creator election
+----
+
+    The creator of a superblock is the enabled masternode whose vin is
+    closest to the current block: the one with the smallest
+    abs(sha256(vin) - sha256(block hash)), both digests read as 256 bit
+    integers. Ties, which need a hash collision, go to the smallest vin.
+
+    Election keeps the hash value of every vin it has seen, so a vin is
+    hashed once instead of once per block, and updates its set of enabled
+    masternodes from the differences between successive lists.
+
+    When NumPy is installed the vin hashes of the enabled set are also
+    kept as an (n, 4) matrix of big endian uint64 limbs, and distances to
+    a block are computed for all masternodes at once. This makes it cheap
+    to run elections for many block hashes (winners()). Without NumPy
+    the same results are computed with Python integers.
+"""
+
+import binascii
+import hashlib
+import heapq
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+LIMB_MASK = (1 << 64) - 1
+
+def hash_value(data):
+    """ sha256 of data as an integer """
+    return int(hashlib.sha256(data).hexdigest(), 16)
+
+def to_limbs(value):
+    """ a 256 bit integer as four 64 bit limbs, most significant first """
+    return [(value >> (64 * (3 - i))) & LIMB_MASK for i in range(4)]
+
+def limb_distances(limbs, value):
+    """ abs(row - value) for each row of an (n, 4) uint64 limb matrix, as limbs """
+    block = numpy.array(to_limbs(value), dtype = numpy.uint64)
+    n = limbs.shape[0]
+    # row >= value, decided by the first limb which differs
+    ge = numpy.ones(n, dtype = bool)
+    decided = numpy.zeros(n, dtype = bool)
+    for i in range(4):
+        ge[~decided & (limbs[:, i] < block[i])] = False
+        decided |= limbs[:, i] != block[i]
+    hi = numpy.where(ge[:, None], limbs, block)
+    lo = numpy.where(ge[:, None], block, limbs)
+    # hi - lo from the least significant limb up, uint64 arithmetic wraps
+    distances = numpy.empty_like(limbs)
+    borrow = numpy.zeros(n, dtype = numpy.uint64)
+    for i in (3, 2, 1, 0):
+        distances[:, i] = hi[:, i] - lo[:, i] - borrow
+        borrow = ((hi[:, i] < lo[:, i]) | ((hi[:, i] == lo[:, i]) & (borrow == 1))).astype(numpy.uint64)
+    return distances
+
+def limb_argmin(distances):
+    """ index of the smallest row, the first one on ties, in a single pass per limb """
+    candidates = numpy.arange(distances.shape[0])
+    for i in range(4):
+        column = distances[candidates, i]
+        candidates = candidates[column == column.min()]
+    return candidates[0]
+
+def limb_ranking(distances):
+    """ row indices from the smallest row to the largest, ties in row order """
+    return numpy.lexsort((distances[:, 3], distances[:, 2], distances[:, 1], distances[:, 0]))
+
+class Election():
+
+    def __init__(self, use_numpy = None):
+        if use_numpy is None:
+            use_numpy = numpy is not None
+        self.use_numpy = use_numpy
+        # vin -> hash value, kept for vins which leave the enabled set
+        # since they usually come back
+        self.values = {}
+        self.enabled = set()
+        # enabled vins in sorted order and their limb matrix, rebuilt
+        # after the enabled set changes
+        self.ordered = None
+        self.limbs = None
+
+    def update(self, vins):
+        """ make vins the enabled set, returns (added, removed) counts """
+        vins = set(vins)
+        added = vins - self.enabled
+        removed = self.enabled - vins
+        self.apply_diff(added, removed)
+        return len(added), len(removed)
+
+    def apply_diff(self, added, removed):
+        """ enable the added vins and disable the removed ones """
+        for vin in added:
+            if vin not in self.values:
+                self.values[vin] = hash_value(vin)
+        self.enabled.difference_update(removed)
+        self.enabled.update(added)
+        if len(added) > 0 or len(removed) > 0:
+            self.ordered = None
+            self.limbs = None
+        # don't keep values of vins which are gone for good
+        if len(self.values) > 2 * len(self.enabled) + 100:
+            self.values = dict((vin, self.values[vin]) for vin in self.enabled)
+
+    def matrix(self):
+        """ (sorted enabled vins, their hash values as an (n, 4) uint64 limb matrix) """
+        if self.limbs is None:
+            self.ordered = sorted(self.enabled)
+            digests = b"".join(binascii.unhexlify("%064x" % self.values[vin]) for vin in self.ordered)
+            self.limbs = numpy.frombuffer(digests, dtype = ">u8").reshape(-1, 4).astype(numpy.uint64)
+        return self.ordered, self.limbs
+
+    def sort_key(self, block_value):
+        values = self.values
+        return lambda vin: (abs(values[vin] - block_value), vin)
+
+    def winner(self, block_hash):
+        """ the elected vin for block_hash, None without enabled masternodes """
+        if len(self.enabled) == 0:
+            return None
+        block_value = hash_value(block_hash)
+        if self.use_numpy:
+            ordered, limbs = self.matrix()
+            return ordered[limb_argmin(limb_distances(limbs, block_value))]
+        return min(self.enabled, key = self.sort_key(block_value))
+
+    def winners(self, block_hashes):
+        """ the elected vin for each of block_hashes, for what-if elections """
+        return [self.winner(block_hash) for block_hash in block_hashes]
+
+    def ranking(self, block_hash):
+        """ all enabled vins, best first """
+        block_value = hash_value(block_hash)
+        if self.use_numpy:
+            ordered, limbs = self.matrix()
+            return [ordered[i] for i in limb_ranking(limb_distances(limbs, block_value))]
+        return sorted(self.enabled, key = self.sort_key(block_value))
+
+    def top(self, block_hash, k):
+        """ the k closest vins to block_hash, best first """
+        if self.use_numpy:
+            return self.ranking(block_hash)[:k]
+        return heapq.nsmallest(k, self.enabled, key = self.sort_key(hash_value(block_hash)))
+
+    def rank(self, block_hash, vin):
+        """ position of vin in the election for block_hash, 0 for the winner,
+            None if vin isn't enabled
+        """
+        if vin not in self.enabled:
+            return None
+        if self.use_numpy:
+            return self.ranking(block_hash).index(vin)
+        key = self.sort_key(hash_value(block_hash))
+        vin_key = key(vin)
+        return sum(1 for other in self.enabled if key(other) < vin_key)
+
+    def is_in_top(self, block_hash, vin, k):
+        rank = self.rank(block_hash, vin)
+        return rank is not None and rank < k
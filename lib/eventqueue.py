@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+
+"""
+Event queue
+----
+
+    Several sentinel processes, on one host or many, can work through
+    the event table of a shared database. A worker claims due events by
+    stamping them with a random token and a lease in a single UPDATE, so
+    two workers never hold the same event, then loads them by token:
+
+        token = claim(prepared)
+        select ... from event where claim_token = %s
+
+    When it's done it writes the events back and clears the claim with
+    release(). The write only applies while the claim is still held, so a
+    worker which outlived its lease can't overwrite the next holder. An
+    event whose worker died is claimable again once the lease expires.
+
+    Failed attempts are retried with exponential backoff. After
+    EVENT_MAX_ATTEMPTS failures the event is dead-lettered: error_time is
+    set and error_message says why, which takes it out of the queue.
+
+    Times are epochs bound as parameters, like the columns they are
+    compared with.
+
+    Submitting waits for the collateral to mature. When it's prepared
+    the fee transaction can't be mined before the next block, so the
+    event gets a projected maturity_height and isn't claimed for submission
+    before the tip reaches it. The transaction is then looked up once
+    and its inclusion height recorded in fee_tx_height, which pins down
+    maturity_height for good. A waiting event costs no RPC calls.
+"""
+
+import uuid
+
+import libmysql
+import misc
+
+# Seconds a claim is held, must be longer than a worker takes to process it
+EVENT_LEASE_SECONDS = 600
+EVENT_CLAIM_LIMIT = 100
+EVENT_RETRY_BASE_SECONDS = 30
+EVENT_RETRY_MAX_SECONDS = 3600
+EVENT_MAX_ATTEMPTS = 10
+# Confirmations of the fee transaction needed before an object is submitted
+CONFIRMATIONS_REQUIRED = 7
+# Size of event.error_message
+MAX_ERROR_MESSAGE = 255
+
+CLAIM_SQL = """update event set claim_token = %%s, lease_expires = %%s
+    where error_time = 0 and submit_time = 0 and %s
+    and start_time <= %%s and next_attempt_time <= %%s and lease_expires <= %%s
+    order by id limit %%s"""
+
+PENDING_PREPARE = "prepare_time = 0"
+PENDING_SUBMIT = "prepare_time > 0 and maturity_height <= %s"
+
+RELEASE_SQL = """update event set prepare_time = %s, submit_time = %s, error_time = %s,
+    error_message = %s, attempts = %s, next_attempt_time = %s, fee_tx_height = %s,
+    maturity_height = %s, claim_token = '', lease_expires = 0
+    where id = %s and claim_token = %s"""
+
+UNCLAIM_SQL = "update event set claim_token = '', lease_expires = 0 where claim_token = %s"
+
+CLAIMED_SQL = "select %s from event where claim_token = %%s order by id"
+
+def get_claim_sql(prepared):
+    """ claims events waiting to be submitted if prepared, else waiting to be prepared """
+    return CLAIM_SQL % (PENDING_SUBMIT if prepared else PENDING_PREPARE)
+
+def get_claimed_sql(columns):
+    """ selects columns of the events held by a claim token """
+    return CLAIMED_SQL % columns
+
+def claim(prepared, height = 0, limit = EVENT_CLAIM_LIMIT, lease_seconds = EVENT_LEASE_SECONDS):
+    """ leases up to limit due events, returns the claim token
+
+        Events to submit are only due once height, the chain tip, has
+        reached their maturity_height.
+    """
+    token = uuid.uuid4().hex
+    now = misc.get_epoch()
+    params = [token, now + lease_seconds]
+    if prepared:
+        params.append(height)
+    params += [now, now, now, limit]
+    c = libmysql.db.cursor()
+    c.execute(get_claim_sql(prepared), params)
+    c.close()
+    libmysql.db.commit()
+    return token
+
+def retry_delay(attempts):
+    """ seconds to wait after the attempts'th failure """
+    return min(EVENT_RETRY_BASE_SECONDS * 2 ** max(0, attempts - 1), EVENT_RETRY_MAX_SECONDS)
+
+def failure(attempts, message, now):
+    """ (attempts, next_attempt_time, error_time, error_message) after another failed attempt """
+    attempts += 1
+    message = str(message)
+    if attempts >= EVENT_MAX_ATTEMPTS:
+        message = "gave up after %d attempts: %s" % (attempts, message)
+        return attempts, 0, now, message[:MAX_ERROR_MESSAGE]
+    return attempts, now + retry_delay(attempts), 0, message[:MAX_ERROR_MESSAGE]
+
+def get_maturity(confirmations, height):
+    """ (fee_tx_height, maturity_height) of a fee transaction with confirmations at height
+
+        An unconfirmed transaction has no fee_tx_height yet (0), it
+        matures CONFIRMATIONS_REQUIRED blocks after the next one at the
+        earliest.
+    """
+    if confirmations > 0:
+        fee_tx_height = height - confirmations + 1
+        return fee_tx_height, fee_tx_height + CONFIRMATIONS_REQUIRED - 1
+    return 0, height + CONFIRMATIONS_REQUIRED
+
+def release(rows):
+    """ writes back claimed events and frees them, returns how many were still held
+
+        rows are (prepare_time, submit_time, error_time, error_message,
+        attempts, next_attempt_time, fee_tx_height, maturity_height, id,
+        claim_token)
+    """
+    if len(rows) == 0:
+        return 0
+    c = libmysql.db.cursor()
+    c.executemany(RELEASE_SQL, rows)
+    released = c.rowcount
+    c.close()
+    libmysql.db.commit()
+    return released
+
+def unclaim(token):
+    """ frees every event still held by token without changing it """
+    c = libmysql.db.cursor()
+    c.execute(UNCLAIM_SQL, (token,))
+    c.close()
+    libmysql.db.commit()
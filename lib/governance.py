@@ -22,13 +22,13 @@ class GovernanceObjectMananger:
 
         sql = """
             select id from governance_object 
-            where governance_object.object_name = '%s' 
+            where governance_object.object_name = %s 
             limit 1
-        """ % name
+        """
 
-        libmysql.db.query(sql)
-        res = libmysql.db.store_result()
-        row = res.fetch_row()
+        c = libmysql.execute(sql, (name,))
+        row = c.fetchone()
+        c.close()
         if row:
             return True
 
@@ -41,17 +41,17 @@ class GovernanceObjectMananger:
             select
                 governance_object.id
             from governance_object left join action on governance_object.action_valid_id = action.id
-            where governance_object.object_name = '%s' 
+            where governance_object.object_name = %s 
             order by action.absolute_yes_count desc
             limit 1
-        """ % name
+        """
 
-        libmysql.db.query(sql)
-        res = libmysql.db.store_result()
-        row = res.fetch_row()
+        c = libmysql.execute(sql, (name,))
+        row = c.fetchone()
+        c.close()
         if row:
-            print "found govobj id", row[0][0]
-            objid = row.pop(0).pop(0)
+            print "found govobj id", row[0]
+            objid = row[0]
             obj = GovernanceObject()
             obj.load(objid)
             return obj
@@ -181,11 +181,11 @@ class GovernanceObject:
                 object_fee_tx
             from governance_object where 
                 id = %s
-        """ % record_id
+        """
 
-        libmysql.db.query(sql)
-        res = libmysql.db.store_result()
-        row = res.fetch_row()
+        c = libmysql.execute(sql, (record_id,))
+        row = c.fetchone()
+        c.close()
         
         if row:
             (
@@ -199,7 +199,7 @@ class GovernanceObject:
                 self.governance_object["object_revision"],
                 self.governance_object["object_data"],
                 self.governance_object["object_fee_tx"]
-            ) = row[0]
+            ) = row
 
             print "loaded govobj successfully: ", self.governance_object["id"]
 
@@ -226,37 +226,38 @@ class GovernanceObject:
                     (parent_id, object_hash, object_parent_hash, object_creation_time, object_name, object_type, object_revision, 
                         object_fee_tx, object_data)
                 VALUES
-                    ('%(parent_id)s', '%(object_hash)s', '%(object_parent_hash)s',  '%(object_creation_time)s', '%(object_name)s',  '%(object_type)s', '%(object_revision)s', 
-                        '%(object_fee_tx)s', '%(object_data)s')
+                    (%(parent_id)s, %(object_hash)s, %(object_parent_hash)s,  %(object_creation_time)s, %(object_name)s,  %(object_type)s, %(object_revision)s, 
+                        %(object_fee_tx)s, %(object_data)s)
             """
 
-            print sql % self.governance_object
+            print sql
 
-            libmysql.db.query(sql % self.governance_object)
+            c = libmysql.execute(sql, self.governance_object)
+            self.governance_object["id"] = c.lastrowid
+            c.close()
             self.save_subclasses()
 
-            self.governance_object["id"] = libmysql.db.insert_id()
             return self.governance_object["id"]
 
         else:
             sql = """
                 UPDATE governance_object SET
-                    parent_id='%(parent_id)s',
-                    object_hash='%(object_hash)s',
-                    object_parent_hash='%(object_parent_hash)s',
-                    object_creation_time='%(object_creation_time)s',
-                    object_name='%(object_name)s',
-                    object_type='%(object_type)s',
-                    object_revision='%(object_revision)s',
-                    object_fee_tx='%(object_fee_tx)s',
-                    object_data='%(object_data)s'
+                    parent_id=%(parent_id)s,
+                    object_hash=%(object_hash)s,
+                    object_parent_hash=%(object_parent_hash)s,
+                    object_creation_time=%(object_creation_time)s,
+                    object_name=%(object_name)s,
+                    object_type=%(object_type)s,
+                    object_revision=%(object_revision)s,
+                    object_fee_tx=%(object_fee_tx)s,
+                    object_data=%(object_data)s
                 WHERE 
-                    id='%(id)s'
+                    id=%(id)s
             """
 
-            print sql % self.governance_object
+            print sql
 
-            libmysql.db.query(sql % self.governance_object)
+            libmysql.execute(sql, self.governance_object).close()
 
             self.save_subclasses()
 
@@ -311,9 +312,9 @@ class Event:
                 submit_time,
                 error_time
             from event where 
-                id = %s """ % record_id
+                id = %s """
 
-        row = libmysql.query_one(sql, self.event)
+        row = libmysql.query_one(sql, (record_id,))
         if row:
             print "retrieving record", row
             (self.event["id"], self.event["governance_object_id"], self.event["start_time"],
@@ -349,8 +350,8 @@ class Event:
         """
 
         print "save governance_object"
-        print sql % self.event
-        libmysql.db.query(sql % self.event)
+        print sql
+        libmysql.execute(sql, self.event).close()
 
     def update_field(self, field, value):
         self.event[field] = value
@@ -363,9 +364,7 @@ class Event:
             WHERE id = %s
         """
 
-        c=libmysql.db.cursor()
-        c.execute(sql , (message, self.event['id']))
-        c.close()
+        libmysql.execute(sql, (message, self.event['id'])).close()
 
 
 
@@ -387,14 +386,14 @@ class Setting:
                 name,
                 value
             from setting where 
-                id = %s """ % record_id
+                id = %s """
 
-        libmysql.db.query(sql)
-        res = libmysql.db.store_result()
-        row = res.fetch_row()
+        c = libmysql.execute(sql, (record_id,))
+        row = c.fetchone()
+        c.close()
         if row:
-            print row[0]
-            (self.setting["id"], self.setting["name"], self.setting["value"]) = row[0]
+            print row
+            (self.setting["id"], self.setting["name"], self.setting["value"]) = row
             print "loaded setting successfully"
 
             return True
@@ -409,18 +408,18 @@ class Setting:
             INSERT INTO setting 
                 (id, setting, name, value)
             VALUES
-                ('%(id)s','%(setting)s','%(name)s','%(value)s')
+                (%(id)s,%(setting)s,%(name)s,%(value)s)
             ON DUPLICATE KEY UPDATE
-                id='%(id)s',
-                setting='%(setting)s',
-                name='%(name)s',
-                value='%(value)s'
+                id=%(id)s,
+                setting=%(setting)s,
+                name=%(name)s,
+                value=%(value)s
         """
 
-        libmysql.db.query(sql % self.user)
+        libmysql.execute(sql, self.setting).close()
 
         return True
 
 
     def set_field(self, name, value):
-        self.user[name] = value
+        self.setting[name] = value
@@ -1,20 +1,183 @@
-
 import MySQLdb as mdb
+import threading
+import time
+import config
+
+"""
+    MySQL connection pool
+    ----
+
+    libmysql.db forwards to the connection checked out by the current
+    thread. Code which runs as a unit of work (a daemon task, a worker
+    thread) should hold its own connection:
+
+        with libmysql.checkout():
+            libmysql.db.cursor() ...
+
+    Threads which use libmysql.db without a checkout are given a
+    connection the first time they touch it and keep it.
+
+    Connections are health checked with ping() on checkout and reopened
+    with exponential backoff when the server has gone away (for instance
+    after wait_timeout).
+"""
+
+DEFAULT_POOL_SIZE = 4
+
+# Seconds to wait before successive reconnect attempts
+RECONNECT_BACKOFF_SECONDS = [ 1, 2, 4, 8, 16, 30 ]
+
+class ConnectionPool:
+
+    def __init__(self, params, size = DEFAULT_POOL_SIZE):
+        self.params = params
+        self.size = size
+        self.idle = []
+        self.nOpen = 0
+        self.cond = threading.Condition()
+
+    def open(self):
+        """ open a new connection, retrying with backoff """
+        for delay in RECONNECT_BACKOFF_SECONDS + [ None ]:
+            try:
+                return mdb.connect(*self.params)
+            except mdb.OperationalError as e:
+                if delay is None:
+                    raise
+                print "libmysql: connect failed (%s), retrying in %d seconds" % (e, delay)
+                time.sleep(delay)
+
+    def is_healthy(self, conn):
+        try:
+            conn.ping()
+            return True
+        except mdb.Error:
+            return False
+
+    def checkout(self):
+        """ returns a healthy connection, blocks while all connections are in use """
+        with self.cond:
+            while len(self.idle) == 0 and self.nOpen >= self.size:
+                self.cond.wait()
+            if len(self.idle) > 0:
+                conn = self.idle.pop()
+            else:
+                conn = None
+            self.nOpen += 1
+        try:
+            if conn is None:
+                conn = self.open()
+            else:
+                conn = self.ensure_healthy(conn)
+        except:
+            with self.cond:
+                self.nOpen -= 1
+                self.cond.notify()
+            raise
+        return conn
+
+    def ensure_healthy(self, conn):
+        """ returns conn, or a replacement if it has been disconnected """
+        if self.is_healthy(conn):
+            return conn
+        print "libmysql: connection lost, reconnecting"
+        self.close_quietly(conn)
+        return self.open()
+
+    def checkin(self, conn):
+        # Don't hand out a connection with an open transaction
+        try:
+            conn.rollback()
+        except mdb.Error:
+            self.close_quietly(conn)
+            conn = None
+        with self.cond:
+            self.nOpen -= 1
+            if conn is not None:
+                self.idle.append(conn)
+            self.cond.notify()
+
+    def add_idle(self, conn):
+        with self.cond:
+            self.idle.append(conn)
+            self.cond.notify()
 
-db = None
+    def close_quietly(self, conn):
+        try:
+            conn.close()
+        except mdb.Error:
+            pass
 
-def connect(hostname, username, password, database):
-    global db
-    db=mdb.connect(hostname, username, password, database)
+class ThreadConnection:
+
+    """ forwards attribute access to the current thread's connection """
+
+    def get(self):
+        conn = getattr(local, "conn", None)
+        if conn is None:
+            # Implicit checkout for code which doesn't use checkout(),
+            # kept for the lifetime of the thread
+            conn = pool.checkout()
+            local.conn = conn
+        return conn
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+local = threading.local()
+pool = None
+db = ThreadConnection()
+
+def connect(hostname, username, password, database, pool_size = None):
+    global pool
+    if pool_size is None:
+        pool_size = getattr(config, "db_pool_size", DEFAULT_POOL_SIZE)
+    pool = ConnectionPool((hostname, username, password, database), pool_size)
+    # open the first connection straight away so configuration errors show up at startup
+    pool.add_idle(pool.open())
     return db
 
+class checkout:
+
+    """ context manager holding a pooled connection for the current thread
+
+        A thread which already holds a connection keeps using it, after a
+        health check.
+    """
+
+    def __enter__(self):
+        current = getattr(local, "conn", None)
+        self.owned = current is None
+        if self.owned:
+            local.conn = pool.checkout()
+        else:
+            local.conn = pool.ensure_healthy(current)
+        return local.conn
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.owned:
+            conn = local.conn
+            local.conn = None
+            pool.checkin(conn)
+        return False
+
+def execute(sql, params = None):
+    """ execute sql with bound parameters (a sequence or a dictionary for %(name)s), returns the cursor
+
+        MySQLdb has no server-side prepared statements, parameters are
+        bound by the driver: values are escaped one at a time and never
+        concatenated into SQL by our code.
+    """
+    cur = db.cursor()
+    cur.execute(sql, params)
+    return cur
+
 def query_one(sql, dictionary):
     """
         clean up records to work with sql updates
     """
-    global db
-    cur = db.cursor()
-    cur.execute(sql % dictionary)
+    cur = execute(sql, dictionary)
     row = cur.fetchone()
+    cur.close()
 
     return row
@@ -6,6 +6,8 @@ import time
 import re
 import datetime
 import random
+import threading
+from collections import OrderedDict
 from time import sleep
 
 """
@@ -39,6 +41,39 @@ def get_epoch():
 def add_sentinel_option(param):
     sentinel_options.append(param)
 
+class LRUCache:
+
+    """ dictionary holding at most max_size entries, the least recently used are evicted """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default = None):
+        with self.lock:
+            try:
+                value = self.entries.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            # move to the most recently used end
+            self.entries[key] = value
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = value
+            if len(self.entries) > self.max_size:
+                self.entries.popitem(last = False)
+
+    def __len__(self):
+        return len(self.entries)
+
 def convert_govobj_name_to_type(govname):
     if govname == "user": return 2
 
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+
+"""
+Daemon notifications
+----
+
+    scripts/blocknotify.py wakes sentineld through a Unix datagram socket
+    (config.notify_socket). Each datagram is a single message:
+
+        block <block hash>
+        governance
+
+    Listener.wait() blocks until a message arrives or the timeout
+    expires. After the first message it keeps reading for
+    NOTIFY_COALESCE_SECONDS, so a burst of notifications (several blocks
+    while dashd catches up) wakes the daemon once.
+"""
+
+import errno
+import os
+import select
+import socket
+import time
+
+NOTIFY_COALESCE_SECONDS = 0.2
+MAX_MESSAGE_SIZE = 4096
+
+def send(path, kind, data = ""):
+    """ send a notification, returns False if nothing is listening """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    try:
+        sock.sendto((kind + " " + data).strip(), path)
+        return True
+    except socket.error:
+        return False
+    finally:
+        sock.close()
+
+class Listener():
+
+    def __init__(self, path, coalesce_seconds = NOTIFY_COALESCE_SECONDS):
+        self.path = path
+        self.coalesce_seconds = coalesce_seconds
+        # left behind by a previous run
+        if os.path.exists(path):
+            os.unlink(path)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(path)
+        self.sock.setblocking(0)
+
+    def wait(self, timeout):
+        """ returns { kind : data of the last message of that kind }, empty on timeout """
+        events = {}
+        deadline = None
+        while True:
+            if deadline is None:
+                wait_seconds = timeout
+            else:
+                wait_seconds = max(0, deadline - time.time())
+            try:
+                readable, writable, failed = select.select([self.sock], [], [], wait_seconds)
+            except select.error as e:
+                if e.args[0] != errno.EINTR:
+                    raise
+                return events
+            if not readable:
+                return events
+            self.drain(events)
+            if deadline is None:
+                deadline = time.time() + self.coalesce_seconds
+
+    def drain(self, events):
+        while True:
+            try:
+                message = self.sock.recv(MAX_MESSAGE_SIZE)
+            except socket.error as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    return
+                raise
+            parts = message.split(None, 1)
+            if len(parts) > 0:
+                events[parts[0]] = parts[1] if len(parts) > 1 else ""
+
+    def close(self):
+        self.sock.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
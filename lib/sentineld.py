@@ -65,12 +65,18 @@ import binascii
 import calendar
 import hashlib
 import re
+import threading
+import traceback
+from multiprocessing.pool import ThreadPool
 
 import base58_dash as base58
+import notify
+import eventqueue
+from election import Election
 
 #from governance import Event
 #from classes import Proposal, Superblock
-from dashd import CTransaction, rpc_command
+from dashd import CTransaction, RPCError, rpc_batch, rpc_call, rpc_command, rpc_stream
 
 import time
 
@@ -82,6 +88,23 @@ DEBUG = True
 
 GOVERNANCE_UPDATE_PERIOD_SECONDS = 30
 
+# With block notifications (config.notify_socket) the governance sync
+# runs when a block or governance change is announced, and at least
+# this often in case notifications are lost
+GOVERNANCE_FALLBACK_SYNC_SECONDS = 300
+
+# Use "gobject diff" between full "gobject list" syncs when dashd supports it.
+# Note: dashd keeps a single diff watermark, so only one consumer may use this.
+GOVERNANCE_USE_DIFF = False
+
+# Maximum time between full "gobject list" syncs when diffs are enabled.
+# Vote count changes are only picked up by full syncs.
+GOVERNANCE_FULL_SYNC_PERIOD_SECONDS = 600
+
+# Number of new objects or vote count changes written at a time while a
+# gobject list is being streamed
+GOVERNANCE_STORE_BATCH_SIZE = 1000
+
 # Number of blocks before a superblock to create superblock objects for
 # auto vote.
 #SUPERBLOCK_CREATION_DELTA = 10
@@ -103,6 +126,21 @@ ENABLE_SUPERBLOCK_VALIDATION = True
 # For testing, set to False in production
 ENABLE_WIN_ALL_ELECTIONS = True
 
+# Maximum number of values in a single "in ( ... )" SQL list
+SQL_IN_CHUNK_SIZE = 1000
+
+# Without a block tip file (see scripts/blocknotify.py) the chain tip is
+# checked with getblockchaininfo at most this often
+BLOCK_TIP_POLL_SECONDS = 5
+
+# A task which runs longer than this is reported as overrunning by the
+# TaskScheduler, unless it was added with its own deadline
+TASK_DEADLINE_SECONDS = 120
+
+# Number of dashd connections ProcessEventsTask prepares and submits
+# events over at once, unless config.event_rpc_workers is set
+EVENT_RPC_WORKERS = 4
+
 OBJECT_TYPE_MAP = { govtypes.trigger: "trigger", govtypes.proposal: "proposal" }
 OBJECT_TYPE_REVERSE_MAP = { "trigger": govtypes.trigger, "proposal": govtypes.proposal }
 
@@ -110,37 +148,61 @@ DB = libmysql.connect( config.hostname, config.username, config.password, config
 
 BASE58_CHARSET = frozenset( [ c for c in base58.b58chars ] )
 
+# Number of addresses remembered by getAddressVersion
+ADDRESS_CACHE_SIZE = 10000
+
+ADDRESS_VERSIONS = misc.LRUCache( ADDRESS_CACHE_SIZE )
+
+NOT_CACHED = object()
+
 def printd( *args ):
     if DEBUG:
         argstring = " ".join( [ str( arg ) for arg in args ] )
         print( argstring )
 
 def validateDashAddress( address ):
+    """True if address is a public key address for the current network"""
+    validVersion = 76 if not TESTNET else 140
+    return ( getAddressVersion( address ) == validVersion )
+
+def validateDashAddresses( addresses ):
+    """Validates many addresses at once, returns a list of booleans in the same order"""
+    validVersion = 76 if not TESTNET else 140
+    versions = dict( [ ( address, getAddressVersion( address ) ) for address in set( addresses ) ] )
+    return [ ( versions[address] == validVersion ) for address in addresses ]
+
+def getAddressVersion( address ):
+    """Version byte of a valid public key address, None if the address is invalid
+
+    Addresses are decoded once, the result is remembered in an LRU cache.
+    """
+    version = ADDRESS_VERSIONS.get( address, NOT_CACHED )
+    if version is NOT_CACHED:
+        version = decodeAddressVersion( address )
+        ADDRESS_VERSIONS.put( address, version )
+    return version
+
+def decodeAddressVersion( address ):
     # Only public key addresses are allowed 
     # A valid address is a RIPEMD-160 hash which contains 20 bytes
     # Prior to base58 encoding 1 version byte is prepended and
     # 4 checksum bytes are appended so the total number of
     # base58 encoded bytes should be 25.  This means the number of characters
     # in the encoding should be about 34 ( 25 * log2( 256 ) / log2( 58 ) ).
-    validVersion = 76 if not TESTNET else 140
-    print "validateDashAddress: address = ", address
 
     # Check length (This is important because the base58 librray has problems
     # with long addresses (which are invalid anyway).
+    if not isinstance( address, basestring ):
+        return None
     if ( ( len( address ) < 34 ) or ( len( address ) > 35 ) ):
-        return False
+        return None
 
     # Check that characters are valid, otherwise base58 library
     # will probably throw an exception.
-    # Would using a compiled regex be faster than this ?
-    for c in address:
-        if c not in BASE58_CHARSET:
-            return False
+    if not BASE58_CHARSET.issuperset( address ):
+        return None
 
-    version = base58.get_bcaddress_version( address )
-    if version is None:
-        return False
-    return ( version == validVersion )
+    return base58.get_bcaddress_version( str( address ) )
 
 def computeHashValue( data ):
     m = hashlib.sha256()
@@ -148,35 +210,188 @@ def computeHashValue( data ):
     hex = m.hexdigest()
     return int( hex, 16 )
 
+class BlockCache:
+
+    """Memoizes dashd query results which only change when a block arrives
+
+    Values are dropped whenever the chain tip changes.  The tip is read
+    from config.block_tip_file, which scripts/blocknotify.py rewrites for
+    every new block, so checking it costs a stat().  Without the file
+    the tip and its height are polled with getblockchaininfo every
+    BLOCK_TIP_POLL_SECONDS.  Otherwise the height is looked up from the
+    tip's header, so the two always belong to the same block.
+
+    Tasks share the cache from their worker threads.  A value is computed
+    outside the cache lock, under a lock of its own key, so it is only
+    queried once per block and a slow query (the masternode list) doesn't
+    hold up lookups of the other keys.
+
+    A thread can pin() the tip it has read, its lookups then don't check
+    for a new block until it calls unpin().  Tasks pin the tip while
+    dashd is streaming a reply, so a lookup costs no rpc call and the
+    values stay consistent for the whole stream.
+    """
+
+    def __init__( self, tipFile = None, pollSeconds = BLOCK_TIP_POLL_SECONDS ):
+        self.tipFile = tipFile
+        self.pollSeconds = pollSeconds
+        self.tip = None
+        self.tipFileVersion = None
+        self.nLastPoll = 0
+        self.values = {}
+        # Per key locks of the values being computed for the current tip
+        self.keyLocks = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # Guards the tip and the dictionaries, never held while computing
+        self.lock = threading.RLock()
+        # Per thread, set while the thread has pinned the tip
+        self.local = threading.local()
+
+    def pin( self ):
+        """Reads the chain tip and keeps it for this thread's lookups"""
+        with self.lock:
+            self.local.pinned = False
+            self.refresh()
+            self.local.pinned = True
+
+    def unpin( self ):
+        self.local.pinned = False
+
+    def refresh( self ):
+        """Drops the cached values if the chain tip has changed"""
+        if getattr( self.local, 'pinned', False ):
+            return
+        if self.tipFile is not None:
+            try:
+                st = os.stat( self.tipFile )
+                tipFileVersion = ( st.st_mtime, st.st_ino )
+            except OSError:
+                tipFileVersion = None
+            if tipFileVersion is not None:
+                # blocknotify is running, the tip only changes with the file
+                if tipFileVersion != self.tipFileVersion:
+                    self.tipFileVersion = tipFileVersion
+                    with open( self.tipFile ) as f:
+                        self.setTip( f.read().strip() )
+                return
+        nCurrentTime = time.time()
+        if nCurrentTime - self.nLastPoll < self.pollSeconds:
+            return
+        self.nLastPoll = nCurrentTime
+        # Both from one call, so the height is the tip's
+        info = rpc_call( "getblockchaininfo" )
+        self.setTip( info['bestblockhash'], info['blocks'] )
+
+    def setTip( self, tip, nHeight = None ):
+        with self.lock:
+            if tip == self.tip:
+                return
+            if self.tip is not None:
+                printd( "BlockCache.setTip New block %s, hits = %d, misses = %d" % ( tip, self.hits, self.misses ) )
+                self.invalidations += 1
+            self.tip = tip
+            # The tip is the hash of the current block
+            self.values = { 'hash': tip }
+            if nHeight is not None:
+                self.values['height'] = nHeight
+            self.keyLocks = {}
+
+    def get( self, key, compute ):
+        return self.getForTip( key, lambda tip: compute() )
+
+    def getForTip( self, key, compute ):
+        """Like get(), compute is called with the hash of the tip the value belongs to"""
+        with self.lock:
+            self.refresh()
+            values = self.values
+            if key in values:
+                self.hits += 1
+                return values[key]
+            keyLock = self.keyLocks.setdefault( key, threading.Lock() )
+        with keyLock:
+            with self.lock:
+                # Computed by another thread while this one waited
+                if key in values:
+                    self.hits += 1
+                    return values[key]
+                self.misses += 1
+            value = compute( values['hash'] )
+            # If the tip has changed meanwhile the value goes with the
+            # dropped values, the threads waiting on keyLock still use it
+            with self.lock:
+                values[key] = value
+            return value
+
+    def getStats( self ):
+        return { 'hits': self.hits, 'misses': self.misses, 'invalidations': self.invalidations }
+
+BLOCK_CACHE = BlockCache( getattr( config, 'block_tip_file', None ) )
+
 def isTestnet():
-    result = rpc_command( "getinfo" )
-    lines = result.splitlines()
-    for line in lines:
-        m = re.match( r'^.*testnet.*:\s*(\S+)\s*,\s*$', line )
-        if m is not None:
-            value = m.group( 1 ).lower()
-            if value == "true":
-                return True
-            else:
-                return False
-    return None
+    info = rpc_call( "getinfo" )
+    return bool( info.get( 'testnet' ) )
 
 def getGovernanceObjects():
-    result = rpc_command( "gobject list" )
-    #print "result = ", result
-    govobjs = json.loads( result )
-    return govobjs
+    return rpc_call( "gobject", "list" )
+
+def iterGovernanceObjects():
+    """Yields ( object_hash, record ) from gobject list as the reply is received"""
+    return rpc_stream( "gobject", "list" )
 
 def getMasternodes():
-    result = rpc_command( "masternodelist full" )
-    #print "result = ", result
-    rec = json.loads( result )
-    #print "rec = ", rec
-    return rec
+    return rpc_call( "masternodelist", "full" )
+
+def iterMasternodes():
+    """Yields ( vin, status string ) from masternodelist full as the reply is received"""
+    return rpc_stream( "masternodelist", "full" )
+
+def getEnabledMasternodes():
+    """Vins of the enabled masternodes, fetched once per block"""
+    return BLOCK_CACHE.get( 'masternodes', loadEnabledMasternodes )
+
+def loadEnabledMasternodes():
+    vins = []
+    for vin, mnstring in iterMasternodes():
+        fields = mnstring.split()
+        if len( fields ) > 0 and fields[0] == 'ENABLED':
+            vins.append( vin )
+    return vins
+
+# Vin hash values and the enabled set are kept across blocks
+ELECTION = Election()
+# The update for a new block can start before the last one has finished
+ELECTION_LOCK = threading.Lock()
+
+def getElection():
+    """The superblock creator election, updated from the masternode list once per block"""
+    return BLOCK_CACHE.get( 'election', updateElection )
+
+def updateElection():
+    vins = getEnabledMasternodes()
+    with ELECTION_LOCK:
+        added, removed = ELECTION.update( vins )
+    printd( "updateElection: added = %d, removed = %d, enabled = %d" % ( added, removed, len( ELECTION.enabled ) ) )
+    return ELECTION
+
+def getMyElectionRank():
+    """Our position in the current election, 0 if we're elected, None if we can't be"""
+    myvin = getMyVin()
+    if myvin is None:
+        return None
+    return getElection().rank( getCurrentBlockHash(), myvin )
 
 def getMyVin():
-    result = rpc_command( "masternode status" )
-    rec = json.loads( result )
+    return BLOCK_CACHE.get( 'vin', loadMyVin )
+
+def loadMyVin():
+    try:
+        rec = rpc_call( "masternode", "status" )
+    except RPCError as e:
+        # dashd returns an error if we aren't running as a masternode
+        printd( "getMyVin: ", e )
+        return None
     #print "rec = ", rec
     if 'vin' not in rec:
         return None
@@ -190,8 +405,11 @@ def getMyVin():
     return vin.strip()
 
 def getBlockCount():
-    result = rpc_command( "getblockcount" )
-    return int( result )
+    """Height of the tip whose hash getCurrentBlockHash returns"""
+    return BLOCK_CACHE.getForTip( 'height', loadBlockHeight )
+
+def loadBlockHeight( blockHash ):
+    return rpc_call( "getblockheader", blockHash )['height']
 
 def getSuperblockCycle():
     # TODO: Add dashd rpc call for this
@@ -199,14 +417,39 @@ def getSuperblockCycle():
     return 24
 
 def getSuperblockBudgetAllocation():
+    return BLOCK_CACHE.get( 'budget', loadSuperblockBudgetAllocation )
+
+def loadSuperblockBudgetAllocation():
     # TODO: Add dashd rpc call for this
     # For now return an arbitrary value for testing
     return 1000
 
 def getCurrentBlockHash():
-    height = getBlockCount()
-    result = rpc_command( "getblockhash %d" % ( height ) )
-    return result
+    return BLOCK_CACHE.get( 'hash', lambda: rpc_call( "getblockhash", getBlockCount() ) )
+
+def getObjectCommandParams( govobj ):
+    """Parameters shared by the gobject prepare and submit rpc calls"""
+    return [ str( govobj.object_parent_hash ),
+             str( govobj.object_revision ),
+             str( govobj.object_creation_time ),
+             govobj.object_name,
+             govobj.object_data ]
+
+def getVoteFingerprint( rec ):
+    """Vote counts of a gobject list record, used to detect changed objects"""
+    return ( int( rec['AbsoluteYesCount'] ), int( rec['YesCount'] ), int( rec['NoCount'] ) )
+
+def decodeGovernanceRecord( rec ):
+    """Parses the payload of a gobject list record, returns ( subtype, fields )
+
+    DataString is the unhexlified DataHex, so when dashd sends it the
+    payload is decoded with a single json.loads.
+    """
+    dataString = rec.get( 'DataString' )
+    if dataString is None:
+        dataString = binascii.unhexlify( rec['DataHex'] )
+    objpair = json.loads( dataString )[0]
+    return objpair[0], objpair[1]
 
 def createGovernanceObject( objRec ):
     dstr = objRec['DataString']
@@ -220,16 +463,89 @@ def createGovernanceObject( objRec ):
     else:
         raise( Exception( "createGovernanceObject: ERROR: Unknown subtype: %s" % ( subtype ) ) )
 
+class DBObjectMeta( type ):
+
+    """Computes the column metadata and SQL statements of a DBObject class
+
+    This runs once, when the class is created, so storing and loading
+    objects only looks the statements up.
+
+    Instances keep their fields in __slots__ generated from getColumns()
+    and the class' extraFields, so the sync can hold one object per
+    network object without a dictionary for each.  An attribute which
+    isn't a column has to be declared in extraFields.
+    """
+
+    def __new__( mcs, name, bases, namespace ):
+        if '__slots__' not in namespace:
+            inherited = set()
+            for base in bases:
+                for klass in base.__mro__:
+                    inherited.update( klass.__dict__.get( '__slots__', () ) )
+            fields = []
+            if 'getColumns' in namespace:
+                fields += namespace['getColumns'].__func__()
+            fields += namespace.get( 'extraFields', () )
+            slots = []
+            for field in fields:
+                if field not in inherited and field not in slots:
+                    slots.append( field )
+            namespace['__slots__'] = tuple( slots )
+        return type.__new__( mcs, name, bases, namespace )
+
+    def __init__( cls, name, bases, namespace ):
+        type.__init__( cls, name, bases, namespace )
+        fieldNames = []
+        for klass in reversed( cls.__mro__ ):
+            fieldNames += klass.__dict__.get( '__slots__', () )
+        cls.fieldNames = tuple( fieldNames )
+        tableName = cls.getTableName()
+        columns = tuple( cls.getColumns() )
+        idColumn = cls.getIdColumn()
+        # The first column is the table's own id, it is never written
+        dataColumns = columns[1:]
+        cls.columns = columns
+        cls.columnSet = frozenset( columns )
+        cls.localColumns = cls.getLocalColumns()
+        cls.jsonColumns = tuple( [ cname for cname in columns if cname not in cls.localColumns ] )
+        cls.idColumn = idColumn
+        # ( row index, attribute ) pairs used to hydrate objects from rows
+        cls.loadIndex = tuple( enumerate( columns ) )[1:]
+        cls.selectList = ", ".join( columns )
+        cls.selectSQL = "select %s from %s " % ( cls.selectList, tableName )
+        cls.selectByIdSQL = cls.selectSQL + "where %s = %%s" % ( idColumn )
+        placeholders = ", ".join( [ "%s" ] * len( dataColumns ) )
+        cls.insertSQL = "insert into %s ( %s ) values( %s )" % ( tableName, ", ".join( dataColumns ), placeholders )
+        cls.updateSQL = "update %s set %s where %s = %%s" % ( tableName, ", ".join( [ cname + " = %s" for cname in dataColumns ] ), idColumn )
+        # Upserts are keyed on the id column, which is the primary key of
+        # governance_object and event and a unique key of the subtype tables
+        upsertColumns = ( idColumn, ) + tuple( [ cname for cname in dataColumns if cname != idColumn ] )
+        cls.upsertColumns = upsertColumns
+        cls.upsertSQL = "insert into %s ( %s ) values( %s ) on duplicate key update %s" % (
+            tableName,
+            ", ".join( upsertColumns ),
+            ", ".join( [ "%s" ] * len( upsertColumns ) ),
+            ", ".join( [ "%s = values( %s )" % ( cname, cname ) for cname in upsertColumns[1:] ] ) )
+
 class DBObject:
 
+    __metaclass__ = DBObjectMeta
+
     def __init__( self ):
         pass
         self.id = None
 
     def makeFields( self, cls ):
-        columns = cls.getColumns()
-        for cname in columns:
-            self.__dict__[cname] = None
+        for cname in cls.columns:
+            setattr( self, cname, None )
+
+    def getFieldDict( self ):
+        """Returns { name : value } for the fields of the object, used for logging"""
+        fields = {}
+        for name in self.fieldNames:
+            if hasattr( self, name ):
+                fields[name] = getattr( self, name )
+        return fields
 
     @staticmethod
     def getTableName():
@@ -240,9 +556,13 @@ class DBObject:
         columns = []
         return columns
 
+    @staticmethod
+    def getLocalColumns():
+        return frozenset()
+
     @classmethod
     def getColumnSet( cls ):
-        return frozenset( cls.getColumns() )
+        return cls.columnSet
 
     @staticmethod
     def getIdColumn():
@@ -250,59 +570,34 @@ class DBObject:
 
     @classmethod
     def getSelectList( cls ):
-        selectList = ""
-        columns = cls.getColumns()
-        for i in range( len( cls.getColumns() ) ):
-            cname = columns[i]
-            selectList += cname
-            if i < ( len( columns ) - 1 ):
-                selectList += ", "
-        return selectList
+        return cls.selectList
 
     @classmethod
     def getSelectSQL( cls ):
-        sql = "select " + cls.getSelectList()
-        sql += " from " + cls.getTableName() + " "
-        return sql
+        return cls.selectSQL
+
+    @classmethod
+    def getSelectByIdSQL( cls ):
+        return cls.selectByIdSQL
 
     @classmethod
     def getInsertSQL( cls ):
-        sql = "insert into %s ( " % ( cls.getTableName() )
-        columns = cls.getColumns()
-        for i in range( 1, len( columns ) ):
-            cname = columns[i]
-            sql += cname
-            if i < ( len( columns ) - 1 ):
-                sql += ", "
-        sql += " ) values( "
-        for i in range( 1, len( columns ) ):
-            sql += "%s"
-            if i < ( len( columns ) - 1 ):
-                sql += ", "
-        sql += " )"
-        return sql
+        return cls.insertSQL
 
     @classmethod
     def getUpdateSQL( cls ):
-        columns = cls.getColumns()
-        sql = "update %s set " % ( cls.getTableName() )
-        for i in range( 1, len( columns ) ):
-            cname = columns[i]
-            sql += cname + " = %s"
-            if i < ( len( columns ) - 1 ):
-                sql += ", "
-        sql += " where %s " % ( cls.getIdColumn() ) 
-        sql += " = %s"
-        return sql
+        return cls.updateSQL
+
+    @classmethod
+    def getUpsertSQL( cls ):
+        return cls.upsertSQL
 
     def isNew( self ):
         print "isNew: self.id = ", self.id
         return ( self.id is None )
 
     def getObjectId( self, cls ):
-        idColumn = cls.getIdColumn()
-        objectId = self.__dict__.get( idColumn )
-        return objectId
+        return getattr( self, cls.idColumn, None )
 
     def setObjectId( self, objectId ):
         """Sets both the id for the base governance class and for the subclass"""
@@ -320,23 +615,17 @@ class DBObject:
         setattr( self, idColumn, objectId )
 
     def getMemberSQL( self, cls, name ):
-        if name not in cls.getColumns():
+        if name not in cls.columnSet:
             raise Exception( "DBObject.getMemberSQL: ERROR Unknown field name: %s" % ( name ) )
-        value = self.__dict__[name]
-        #if value is None:
-        #    return "NULL"
-        return value
+        return getattr( self, name )
 
     def getInstanceData( self, cls ):
-        data = []
-        columns = cls.getColumns()
-        #print "getIntanceData: cls = %s, class = %s, columns = %s" % ( cls, self.__class__, columns )
-        #print "dir(self) = ", dir( self )
-        for cname in columns[1:]:
-            data.append( self.getMemberSQL( cls, cname ) )
-        return data
-
-    def store( self ):
+        return [ getattr( self, cname ) for cname in cls.columns[1:] ]
+
+    def getUpsertData( self, cls ):
+        return [ getattr( self, cname ) for cname in cls.upsertColumns ]
+
+    def store( self, commit = True ):
         # Overridden in subclasses
         return None
 
@@ -344,13 +633,23 @@ class DBObject:
         # Overridden in subclasses
         return None
 
-    def storeInternal( self, cls ):
+    @classmethod
+    def storeMany( cls, objs ):
+        """Stores many objects of this class in a single transaction"""
+        try:
+            DBObject.storeManyInternal( objs, cls )
+        except:
+            libmysql.db.rollback()
+            raise
+        libmysql.db.commit()
+
+    def storeInternal( self, cls, commit = True ):
         data = self.getInstanceData( cls )
         objectId = self.getObjectId( cls )
         if self.isNew():
-            sql = cls.getInsertSQL()
+            sql = cls.insertSQL
         else:
-            sql = cls.getUpdateSQL()
+            sql = cls.updateSQL
             data.append( objectId )
         c = libmysql.db.cursor()
         printd( "DBObject.storeInternal: sql = ", sql )
@@ -358,31 +657,57 @@ class DBObject:
         c.execute( sql, data )
         insertId = libmysql.db.insert_id()
         c.close()
-        libmysql.db.commit()
+        if commit:
+            libmysql.db.commit()
         return insertId
 
+    @staticmethod
+    def storeManyInternal( objs, cls ):
+        """Writes the cls columns of objs with one executemany per statement
+
+        New objects are inserted with a single multi-row insert, existing
+        objects are written with a single multi-row upsert on their id.
+        The caller is responsible for committing.
+        """
+        insertData = []
+        updateData = []
+        for obj in objs:
+            if obj.isNew():
+                insertData.append( obj.getInstanceData( cls ) )
+            else:
+                updateData.append( obj.getUpsertData( cls ) )
+        printd( "DBObject.storeManyInternal: table = %s, inserts = %d, updates = %d" % ( cls.getTableName(), len( insertData ), len( updateData ) ) )
+        c = libmysql.db.cursor()
+        if len( insertData ) > 0:
+            c.executemany( cls.insertSQL, insertData )
+        if len( updateData ) > 0:
+            c.executemany( cls.upsertSQL, updateData )
+        c.close()
+
     def loadInternal( self, cls ):
         objectId = self.getObjectId( cls )
         printd( "DBObject.loadInternal: cls = %s, objectId = %s" % ( cls, objectId ) )
         if objectId is None:
             raise( Exception( "DBObject.loadInternal: ERROR id is NULL" ) )
-        sql = cls.getSelectSQL()
-        sql += "where %s" % ( cls.getIdColumn() )
-        sql += " = %s"
-        printd( "DBObject.loadInternal: sql = ", sql )
         c = libmysql.db.cursor()
-        c.execute( sql, ( objectId ) )
+        c.execute( cls.selectByIdSQL, ( objectId, ) )
         row = c.fetchone()
+        c.close()
         if row is None:
             raise( Exception( "DBObject.loadInternal: ERROR row not found for id = %s" % ( objectId ) ) )
-        columns = cls.getColumns()
-        if len( row ) != len( columns ):
+        if len( row ) != len( cls.columns ):
             raise( Exception( "DBObject.loadInternal: ERROR incorrect row length" ) )
-        for i in range( 1, len( columns ) ):
-            setattr( self, columns[i], row[i] )
+        self.hydrate( cls, row )
+
+    def hydrate( self, cls, row, offset = 0 ):
+        """Sets the cls columns, except the id, from row starting at offset"""
+        for i, cname in cls.loadIndex:
+            setattr( self, cname, row[offset + i] )
 
 class GovernanceObject(DBObject):
 
+    extraFields = ( 'subtype', 'tableName' )
+
     def __init__( self, name ):
         self.makeFields( GovernanceObject )
         self.object_name = name
@@ -437,10 +762,6 @@ class GovernanceObject(DBObject):
                     'is_valid' ]
         return columns
 
-    @classmethod
-    def getColumnSet( cls ):
-        return frozenset( self.getColumns() )
-
     @staticmethod
     def getLocalColumns():
         # local columns are excluded from the JSON and object hash
@@ -459,14 +780,15 @@ class GovernanceObject(DBObject):
     def getIdColumn():
         return 'id'
 
-    def loadJSON( self, rec ):
+    def loadJSON( self, rec, fields = None ):
+        """Loads a gobject list record, fields is its already decoded payload if available"""
         self.object_data = rec['DataHex']
         self.object_hash = rec['Hash']
         self.object_fee_tx = rec['CollateralHash']
         self.absolute_yes_count = int( rec['AbsoluteYesCount'] )
         self.yes_count = int( rec['YesCount'] )
         self.no_count = int( rec['NoCount'] )
-        self.loadJSONFields( rec )
+        self.loadJSONFields( rec, fields )
 
     def getJSON( self ):
         obj = self.getJSONFields()
@@ -482,33 +804,28 @@ class GovernanceObject(DBObject):
     def updateObjectData( self ):
         self.object_data = self.getJSONHex()
 
-    def loadJSONFields( self, rec ):
-        objpair = json.loads( binascii.unhexlify( rec['DataHex'] ) )[0]
-        objrec = objpair[1]
-        columns = self.getColumns()
-        localColumns = self.getLocalColumns()
-        for cname in columns:
-            if cname in localColumns:
-                continue
-            value = objrec[cname]
-            setattr( self, cname, value )
+    def loadJSONFields( self, rec, fields = None ):
+        if fields is None:
+            subtype, fields = decodeGovernanceRecord( rec )
+        for cname in self.jsonColumns:
+            setattr( self, cname, fields[cname] )
 
     def getJSONFields( self ):
         obj = {}
         # Used by dashd to determine object type
         obj['type'] = self.subtype
-        columns = self.getColumns()
-        localColumns = self.getLocalColumns()
-        for cname in columns:
-            if cname in localColumns:
-                continue
+        for cname in self.jsonColumns:
             obj[cname] = getattr( self, cname )
         return obj
 
+    @staticmethod
+    def getExistsSQL():
+        return GovernanceObject.getSelectSQL() + " where object_hash = %s and object_origin = 'REMOTE' "
+
     def existsInDb( self ):
         if len( self.object_hash ) < 1:
             return False
-        sql = GovernanceObject.getSelectSQL() + " where object_hash = %s and object_origin = 'REMOTE' "
+        sql = GovernanceObject.getExistsSQL()
         #print "existsInDb: sql = ", sql
         c = libmysql.db.cursor()
         c.execute( sql, ( self.object_hash ) )
@@ -521,6 +838,101 @@ class GovernanceObject(DBObject):
             self.setObjectId( result[0] )
             return True
 
+    @staticmethod
+    def getRemoteObjectIndexSQL():
+        sql = "select object_hash, absolute_yes_count, yes_count, no_count from governance_object "
+        sql += "where object_origin = 'REMOTE' "
+        return sql
+
+    @staticmethod
+    def getRemoteObjectIndex():
+        """Returns { object_hash : vote fingerprint } for all remote objects in the database"""
+        c = libmysql.db.cursor()
+        c.execute( GovernanceObject.getRemoteObjectIndexSQL() )
+        index = {}
+        for row in c.fetchall():
+            index[row[0]] = ( int( row[1] ), int( row[2] ), int( row[3] ) )
+        c.close()
+        return index
+
+    @staticmethod
+    def getUpdateVoteCountsSQL():
+        sql = "update governance_object set absolute_yes_count = %s, yes_count = %s, no_count = %s "
+        sql += "where object_hash = %s and object_origin = 'REMOTE' "
+        return sql
+
+    @staticmethod
+    def updateVoteCounts( counts ):
+        """Update vote counts of remote objects from a list of ( object_hash, fingerprint ) pairs"""
+        if len( counts ) == 0:
+            return
+        data = [ fingerprint + ( objectHash, ) for ( objectHash, fingerprint ) in counts ]
+        c = libmysql.db.cursor()
+        c.executemany( GovernanceObject.getUpdateVoteCountsSQL(), data )
+        c.close()
+        libmysql.db.commit()
+
+    @staticmethod
+    def getRemoteObjectIdsSQL( nHashes ):
+        sql = "select object_hash, id from governance_object where object_origin = 'REMOTE' and "
+        sql += "object_hash in ( %s ) order by id " % ( ", ".join( [ "%s" ] * nHashes ) )
+        return sql
+
+    @staticmethod
+    def getRemoteObjectIds( hashes ):
+        """Returns { object_hash : id } for the remote objects with the given hashes"""
+        ids = {}
+        hashes = list( hashes )
+        for i in range( 0, len( hashes ), SQL_IN_CHUNK_SIZE ):
+            chunk = hashes[i:i + SQL_IN_CHUNK_SIZE]
+            c = libmysql.db.cursor()
+            c.execute( GovernanceObject.getRemoteObjectIdsSQL( len( chunk ) ), chunk )
+            for row in c.fetchall():
+                ids[row[0]] = row[1]
+            c.close()
+        return ids
+
+    @classmethod
+    def storeMany( cls, objs ):
+        """Stores many proposals and superblocks in a single transaction
+
+        Existing objects are updated and new remote objects inserted with
+        one executemany per table, the ids of new objects are resolved with
+        a single lookup by object hash.  New objects without a usable hash
+        are stored one at a time, still in the same transaction.
+        """
+        if len( objs ) == 0:
+            return
+        batch = []
+        others = []
+        for obj in objs:
+            if ( not obj.isNew() or
+                 ( obj.object_origin == 'REMOTE' and misc.is_hash( obj.object_hash ) ) ):
+                batch.append( obj )
+            else:
+                others.append( obj )
+        newObjs = [ obj for obj in batch if obj.isNew() ]
+        try:
+            DBObject.storeManyInternal( batch, GovernanceObject )
+            ids = GovernanceObject.getRemoteObjectIds( [ obj.object_hash for obj in newObjs ] )
+            for obj in newObjs:
+                obj.initObjectId( ids[obj.object_hash] )
+            for subclass in ( Proposal, Superblock ):
+                DBObject.storeManyInternal( [ obj for obj in batch if isinstance( obj, subclass ) ], subclass )
+            for obj in newObjs:
+                obj.id = ids[obj.object_hash]
+            for obj in others:
+                obj.store( commit = False )
+        except:
+            libmysql.db.rollback()
+            for obj in newObjs:
+                obj.id = None
+            raise
+        libmysql.db.commit()
+
+    def getPaymentAddresses( self ):
+        return []
+
     def isValid( self ):
         # Base class objects aren't valid
         return False
@@ -567,10 +979,10 @@ class Superblock(GovernanceObject):
     def getIdColumn():
         return 'governance_object_id'
 
-    def store( self ):
-        insertId = self.storeInternal( GovernanceObject )
+    def store( self, commit = True ):
+        insertId = self.storeInternal( GovernanceObject, commit )
         self.initObjectId( insertId )
-        self.storeInternal( Superblock )
+        self.storeInternal( Superblock, commit )
         self.id = insertId
         return self.id
 
@@ -579,17 +991,22 @@ class Superblock(GovernanceObject):
         self.loadInternal( Superblock )
         self.setObjectId( self.id )
 
+    @staticmethod
+    def getLocalMatchSQL():
+        """Local superblocks for an event_block_height"""
+        sql = "select governance_object_id, object_status from superblock, governance_object where "
+        sql += "superblock.governance_object_id = governance_object.id and "
+        sql += "event_block_height = %s and "
+        sql += "object_origin = 'LOCAL' "
+        return sql
+
     def isValid( self ):
         printd( "Superblock.isValid name = ", self.superblock_name )
         if not ENABLE_SUPERBLOCK_VALIDATION:
             printd( "Superblock.isValid Validation disabled, returning True" )
             return True
-        sql = "select governance_object_id, object_status from superblock, governance_object where "
-        sql += "superblock.governance_object_id = governance_object.id and "
-        sql += "event_block_height = %s and "
-        sql += "object_origin = 'LOCAL' "
         c = libmysql.db.cursor()
-        c.execute( sql, self.event_block_height )
+        c.execute( Superblock.getLocalMatchSQL(), self.event_block_height )
         rows = c.fetchall()
         if len( rows ) == 0:
             # If we have no local superblock for this event_block_height
@@ -616,6 +1033,9 @@ class Superblock(GovernanceObject):
 
 class Proposal(GovernanceObject):
 
+    # Set by proposal creators, it isn't stored
+    extraFields = ( 'description_url', )
+
     def __init__( self, name ):
         GovernanceObject.__init__( self, name )
         self.makeFields( Proposal )
@@ -657,10 +1077,10 @@ class Proposal(GovernanceObject):
     def getIdColumn():
         return 'governance_object_id'
 
-    def store( self ):
-        insertId = self.storeInternal( GovernanceObject )
+    def store( self, commit = True ):
+        insertId = self.storeInternal( GovernanceObject, commit )
         self.initObjectId( insertId )
-        self.storeInternal( Proposal )
+        self.storeInternal( Proposal, commit )
         self.id = insertId
         return self.id
 
@@ -669,6 +1089,9 @@ class Proposal(GovernanceObject):
         self.loadInternal( Proposal )
         self.setObjectId( self.id )
 
+    def getPaymentAddresses( self ):
+        return [ self.payment_address ]
+
     def isValid( self ):
         if not ENABLE_PROPOSAL_VALIDATION:
             return True
@@ -709,6 +1132,14 @@ class Event(DBObject):
         self.submit_time = 0
         self.error_time = 0
         self.error_message = ''
+        # Lease and retry state, see lib/eventqueue.py
+        self.claim_token = ''
+        self.lease_expires = 0
+        self.attempts = 0
+        self.next_attempt_time = 0
+        # Confirmation tracking of the fee transaction
+        self.fee_tx_height = 0
+        self.maturity_height = 0
 
     @staticmethod
     def getTableName():
@@ -722,7 +1153,13 @@ class Event(DBObject):
                     'prepare_time',
                     'submit_time',
                     'error_time',
-                    'error_message' ]
+                    'error_message',
+                    'claim_token',
+                    'lease_expires',
+                    'attempts',
+                    'next_attempt_time',
+                    'fee_tx_height',
+                    'maturity_height' ]
         return columns
 
     @staticmethod
@@ -732,8 +1169,8 @@ class Event(DBObject):
     def load( self ):
         self.loadInternal( Event )
 
-    def store( self ):
-        return self.storeInternal( Event )
+    def store( self, commit = True ):
+        return self.storeInternal( Event, commit )
 
 class GovernanceFactory:
 
@@ -752,14 +1189,21 @@ class GovernanceFactory:
             raise( Exception( "GovernanceFactory.create: ERROR Unknown subtype: %s" % ( subtype ) ) )
         return govobj
 
+    def createFromRecord( self, rec ):
+        """Creates an object from a gobject list record, decoding its payload once"""
+        subtype, fields = decodeGovernanceRecord( rec )
+        govobj = self.create( subtype, rec['Name'] )
+        govobj.loadJSON( rec, fields )
+        return govobj
+
     def createFromTable( self, subtype, objectId ):
         printd( "GovernanceFactory.createFromTable Start subtype = %s, objectId = %s" % ( subtype, objectId ) )
         govobj = self.create( subtype, None )
         govobj.setObjectId( objectId )
-        printd( "GovernanceFactory.createFromTable Before load, govobj = " % govobj.__dict__ )
+        printd( "GovernanceFactory.createFromTable Before load, govobj = ", govobj.getFieldDict() )
         assert( govobj.id == objectId )
         govobj.load()
-        printd( "GovernanceFactory.createFromTable After load, govobj = " % govobj.__dict__ )
+        printd( "GovernanceFactory.createFromTable After load, govobj = ", govobj.getFieldDict() )
         assert( govobj.id == objectId )
         return govobj
 
@@ -771,6 +1215,51 @@ class GovernanceFactory:
         govobj = self.createFromTable( subtype, objectId )
         return govobj
 
+    def loadMany( self, objectIds ):
+        """Loads many objects with one joined query per subtype
+
+        Returns the objects in the order of objectIds, ids which don't
+        exist are skipped.
+        """
+        objectIds = list( objectIds )
+        objects = {}
+        for subclass in ( Proposal, Superblock ):
+            for i in range( 0, len( objectIds ), SQL_IN_CHUNK_SIZE ):
+                chunk = objectIds[i:i + SQL_IN_CHUNK_SIZE]
+                for govobj in self.loadManyInternal( subclass, chunk ):
+                    objects[govobj.id] = govobj
+        printd( "GovernanceFactory.loadMany: requested = %d, loaded = %d" % ( len( objectIds ), len( objects ) ) )
+        return [ objects[objectId] for objectId in objectIds if objectId in objects ]
+
+    @staticmethod
+    def getLoadManySQL( subclass, nIds ):
+        """Joined select of nIds objects of subclass, the governance_object columns come first"""
+        govTable = GovernanceObject.getTableName()
+        subTable = subclass.getTableName()
+        selectList = [ "%s.%s" % ( govTable, cname ) for cname in GovernanceObject.columns ]
+        selectList += [ "%s.%s" % ( subTable, cname ) for cname in subclass.columns ]
+        sql = "select %s from %s, %s " % ( ", ".join( selectList ), govTable, subTable )
+        sql += "where %s.id = %s.%s and " % ( govTable, subTable, subclass.getIdColumn() )
+        sql += "%s.id in ( %s ) " % ( govTable, ", ".join( [ "%s" ] * nIds ) )
+        return sql
+
+    def loadManyInternal( self, subclass, objectIds ):
+        if len( objectIds ) == 0:
+            return []
+        c = libmysql.db.cursor()
+        c.execute( GovernanceFactory.getLoadManySQL( subclass, len( objectIds ) ), objectIds )
+        rows = c.fetchall()
+        c.close()
+        govobjs = []
+        nGovColumns = len( GovernanceObject.columns )
+        for row in rows:
+            govobj = subclass( None )
+            govobj.hydrate( GovernanceObject, row )
+            govobj.hydrate( subclass, row, nGovColumns )
+            govobj.setObjectId( row[0] )
+            govobjs.append( govobj )
+        return govobjs
+
 GFACTORY = GovernanceFactory()
 
 class SentinelDaemon:
@@ -778,39 +1267,204 @@ class SentinelDaemon:
     def __init__( self ):
         global TESTNET
         self.nMainPeriodSeconds = 5
-        self.tasks = []
+        self.scheduler = TaskScheduler()
         if isTestnet():
             TESTNET = True
         else:
             TESTNET = False
+        # Wakes the main loop as soon as scripts/blocknotify.py reports a block
+        self.listener = None
+        notifySocket = getattr( config, 'notify_socket', None )
+        if notifySocket is not None:
+            self.listener = notify.Listener( notifySocket )
     
-    def addTask( self, task ):
-        self.tasks.append( task )
+    def addTask( self, task, dependsOn = (), nDeadlineSeconds = TASK_DEADLINE_SECONDS ):
+        """Schedules task, it runs after the tasks in dependsOn and never alongside them"""
+        self.scheduler.addTask( task, dependsOn, nDeadlineSeconds )
 
     def runTasks( self ):
-        printd( "SentinelDaemon.runTasks: Running tasks" )
-        for task in self.tasks:
-            if task.isReady():
-                task.run()
+        printd( "SentinelDaemon.runTasks: Starting ready tasks" )
+        self.scheduler.startReady()
+
+    def waitForEvents( self ):
+        """Sleeps until the next tick or until a notification arrives"""
+        if self.listener is None:
+            time.sleep( self.nMainPeriodSeconds )
+            return
+        events = self.listener.wait( self.nMainPeriodSeconds )
+        if len( events ) == 0:
+            return
+        printd( "SentinelDaemon.waitForEvents: events = ", events )
+        if events.get( 'block' ):
+            BLOCK_CACHE.setTip( events['block'] )
+        self.scheduler.notify( events )
 
     def run( self ):
         while True:
             self.runTasks()
-            time.sleep( self.nMainPeriodSeconds )
+            self.waitForEvents()
+
+
+class TaskWorker( threading.Thread ):
+
+    """Runs one task on its own thread each time the scheduler wakes it
+
+    A task has a single worker, so it can't run twice at once, and the
+    thread keeps its dashd connection between runs.
+    """
 
+    def __init__( self, scheduler, task, dependsOn, nDeadlineSeconds ):
+        threading.Thread.__init__( self, name = task.__class__.__name__ )
+        self.daemon = True
+        self.scheduler = scheduler
+        self.task = task
+        self.dependsOn = dependsOn
+        self.dependents = []
+        self.nDeadlineSeconds = nDeadlineSeconds
+        # Set by the scheduler while the task runs
+        self.nStartTime = None
+        self.bOverrun = False
+        self.runs = 0
+        self.overruns = 0
+        self.failures = 0
+        self.wakeup = threading.Event()
+
+    def isRunning( self ):
+        return self.nStartTime is not None
+
+    def run( self ):
+        while True:
+            self.wakeup.wait()
+            self.wakeup.clear()
+            try:
+                # Each run holds a health checked pooled connection
+                with libmysql.checkout():
+                    self.task.run()
+            except Exception:
+                # A failed run mustn't take the worker down with it
+                self.failures += 1
+                print( "TaskWorker.run: ERROR %s failed\n%s" % ( self.name, traceback.format_exc() ) )
+            self.scheduler.taskDone( self )
+
+class TaskScheduler:
+
+    """Runs SentinelTasks concurrently, each on its own TaskWorker
+
+    A task is started when it is ready and isn't running, none of the
+    tasks it depends on or which depend on it are running, and each of its
+    dependencies which is ready has run since the task last did.  Tasks
+    with dependencies therefore run in order, as in a SentinelTaskList,
+    while a long sync doesn't hold up unrelated tasks.
+
+    A run which takes longer than the task's deadline is reported once as
+    an overrun.  Threads can't be stopped, so the run carries on, but the
+    task isn't started again until it finishes.
+    """
+
+    def __init__( self ):
+        self.workers = []
+        self.lock = threading.Lock()
+
+    def addTask( self, task, dependsOn = (), nDeadlineSeconds = TASK_DEADLINE_SECONDS ):
+        workersByTask = dict( ( worker.task, worker ) for worker in self.workers )
+        for dependency in dependsOn:
+            if dependency not in workersByTask:
+                raise( Exception( "TaskScheduler.addTask: ERROR dependency %s must be added first" % dependency.__class__.__name__ ) )
+        worker = TaskWorker( self, task, [ workersByTask[dependency] for dependency in dependsOn ], nDeadlineSeconds )
+        for dependency in worker.dependsOn:
+            dependency.dependents.append( worker )
+        self.workers.append( worker )
+        worker.start()
+        return worker
+
+    def canStart( self, worker ):
+        if worker.isRunning() or not worker.task.isReady():
+            return False
+        for dependency in worker.dependsOn:
+            if dependency.isRunning():
+                return False
+            # A ready dependency goes first unless it ran since this task did
+            if dependency.task.isReady() and dependency.task.nLastRun <= worker.task.nLastRun:
+                return False
+        for dependent in worker.dependents:
+            if dependent.isRunning():
+                return False
+            # Nor does it run again before a ready dependent has seen its last run
+            if dependent.task.isReady() and worker.task.nLastRun > dependent.task.nLastRun:
+                return False
+        return True
+
+    def startReady( self ):
+        with self.lock:
+            nCurrentTime = time.time()
+            # In order of addition, so dependencies are started before
+            # the tasks waiting for them are considered
+            for worker in self.workers:
+                if worker.isRunning():
+                    self.checkDeadline( worker, nCurrentTime )
+                elif self.canStart( worker ):
+                    worker.task.markRun()
+                    worker.nStartTime = nCurrentTime
+                    worker.bOverrun = False
+                    worker.runs += 1
+                    worker.wakeup.set()
+
+    def checkDeadline( self, worker, nCurrentTime ):
+        nElapsed = nCurrentTime - worker.nStartTime
+        if worker.bOverrun or nElapsed <= worker.nDeadlineSeconds:
+            return
+        worker.bOverrun = True
+        worker.overruns += 1
+        print( "TaskScheduler.checkDeadline: WARNING %s has run for %.1f seconds, its deadline is %.1f seconds" % ( worker.name, nElapsed, worker.nDeadlineSeconds ) )
+
+    def taskDone( self, worker ):
+        with self.lock:
+            nCurrentTime = time.time()
+            self.checkDeadline( worker, nCurrentTime )
+            printd( "TaskScheduler.taskDone %s ran for %.1f seconds" % ( worker.name, nCurrentTime - worker.nStartTime ) )
+            worker.nStartTime = None
+        # Tasks waiting for this one don't have to wait for the next tick
+        self.startReady()
+
+    def notify( self, events ):
+        with self.lock:
+            for worker in self.workers:
+                worker.task.notify( events )
+
+    def getStats( self ):
+        with self.lock:
+            return dict( ( worker.name, { 'runs': worker.runs, 'overruns': worker.overruns, 'failures': worker.failures } ) for worker in self.workers )
 
 class SentinelTask:
 
-    def __init__( self, nPeriodSeconds = 0 ):
+    def __init__( self, nPeriodSeconds = 0, triggers = () ):
         self.nPeriodSeconds = nPeriodSeconds
         self.nLastRun = 0
+        # Notification kinds ( 'block', 'governance' ) which make the
+        # task ready before its period is up
+        self.triggers = frozenset( triggers )
+        self.bNotified = False
     
     def isReady( self ):
+        if self.bNotified:
+            return True
         nCurrentTime = time.time()
         if nCurrentTime - self.nLastRun >= self.nPeriodSeconds:
             return True
         return False
 
+    def notify( self, events ):
+        if self.triggers.intersection( events ):
+            self.bNotified = True
+
+    def markRun( self ):
+        self.nLastRun = time.time()
+        self.bNotified = False
+
+    def setSchedule( self, nPeriodSeconds, triggers = () ):
+        self.nPeriodSeconds = nPeriodSeconds
+        self.triggers = frozenset( triggers )
+
     def run( self ):
         pass
 
@@ -818,8 +1472,8 @@ class SentinelTaskList(SentinelTask):
 
     """Represents a list of tasks tha should be run sequentially in order"""
 
-    def __init__( self, nPeriodSeconds ):
-        SentinelTask.__init__( self, nPeriodSeconds )
+    def __init__( self, nPeriodSeconds, triggers = () ):
+        SentinelTask.__init__( self, nPeriodSeconds, triggers )
         self.taskList = []
     
     def addTask( self, task ):
@@ -831,29 +1485,92 @@ class SentinelTaskList(SentinelTask):
     
 class UpdateGovernanceTask(SentinelTask):
 
+    """Incrementally syncs remote governance objects into the database
+
+    Only objects whose hash or vote counts changed since the last sync
+    are materialized and written to the database.
+    """
+
     def __init__( self ):
         SentinelTask.__init__( self, GOVERNANCE_UPDATE_PERIOD_SECONDS )
+        # object_hash -> vote fingerprint of every remote object in the
+        # database, loaded on the first run and kept up to date afterwards
+        self.storedObjects = None
+        self.useDiff = GOVERNANCE_USE_DIFF
+        self.nLastFullSync = 0
+
+    def getRecords( self ):
+        """Returns an iterator of ( object_hash, record ) pairs"""
+        nCurrentTime = time.time()
+        if ( self.useDiff and self.nLastFullSync > 0 and
+             nCurrentTime - self.nLastFullSync < GOVERNANCE_FULL_SYNC_PERIOD_SECONDS ):
+            try:
+                return rpc_call( "gobject", "diff" ).iteritems()
+            except RPCError as e:
+                printd( "UpdateGovernanceTask.getRecords gobject diff unavailable, disabling: ", e )
+                self.useDiff = False
+        self.nLastFullSync = nCurrentTime
+        return iterGovernanceObjects()
 
     def run( self ):
-        govobjs = getGovernanceObjects()
+        if self.storedObjects is None:
+            self.storedObjects = GovernanceObject.getRemoteObjectIndex()
+            printd( "UpdateGovernanceTask.run Loaded %d stored objects" % ( len( self.storedObjects ) ) )
+        # Records are consumed as they are received and written in
+        # batches, so memory use doesn't grow with the size of the network
         newobjs = []
-        for key, rec in govobjs.items():
-            #print "rec = ", rec
-            #print "DataString:", rec['DataString']
-            datarec = json.loads( rec['DataString'] )[0]
-            subtype = datarec[0]
-            name = rec['Name']
-            govobj = GFACTORY.create( subtype, name )
-            govobj.loadJSON( rec )
-            if not govobj.existsInDb():
-                newobjs.append( govobj )
-        printd( "UpdateGovernanceTask.run len( newobjs ) = ", len( newobjs ) )
-        for obj in newobjs:
+        changedCounts = []
+        nNew = 0
+        nChanged = 0
+        # Read the tip and the budget before streaming, validating the
+        # objects mustn't poll dashd for every record
+        BLOCK_CACHE.pin()
+        try:
+            getSuperblockBudgetAllocation()
+            for key, rec in self.getRecords():
+                fingerprint = getVoteFingerprint( rec )
+                storedFingerprint = self.storedObjects.get( key )
+                if storedFingerprint == fingerprint:
+                    continue
+                if storedFingerprint is not None:
+                    # Already stored, only the votes changed
+                    changedCounts.append( ( key, fingerprint ) )
+                    nChanged += 1
+                    if len( changedCounts ) >= GOVERNANCE_STORE_BATCH_SIZE:
+                        self.storeChangedCounts( changedCounts )
+                        changedCounts = []
+                    continue
+                govobj = GFACTORY.createFromRecord( rec )
+                newobjs.append( ( key, fingerprint, govobj ) )
+                nNew += 1
+                if len( newobjs ) >= GOVERNANCE_STORE_BATCH_SIZE:
+                    self.storeNewObjects( newobjs )
+                    newobjs = []
+        finally:
+            BLOCK_CACHE.unpin()
+        self.storeChangedCounts( changedCounts )
+        self.storeNewObjects( newobjs )
+        printd( "UpdateGovernanceTask.run new objects = %d, changed vote counts = %d" % ( nNew, nChanged ) )
+
+    def storeChangedCounts( self, changedCounts ):
+        GovernanceObject.updateVoteCounts( changedCounts )
+        self.storedObjects.update( changedCounts )
+
+    def storeNewObjects( self, newobjs ):
+        # Validate all payment addresses in one pass, isValid then finds
+        # them in the address cache
+        addresses = []
+        for key, fingerprint, obj in newobjs:
+            addresses += obj.getPaymentAddresses()
+        validateDashAddresses( addresses )
+        for key, fingerprint, obj in newobjs:
             valid = obj.isValid()
             obj.is_valid = valid
             obj.object_status = "NEW"
             obj.object_origin = "REMOTE"
-            obj.store()
+        GovernanceObject.storeMany( [ obj for key, fingerprint, obj in newobjs ] )
+        for key, fingerprint, obj in newobjs:
+            self.storedObjects[key] = fingerprint
 
 class CreateSuperblockTask(SentinelTask):
 
@@ -889,30 +1606,16 @@ class CreateSuperblockTask(SentinelTask):
 
     def isElected( self ):
         """Determine if we are the winner of the current superblock creator election"""
-        blockHashVal = computeHashValue( getCurrentBlockHash() )
         myvin = getMyVin()
         if myvin is None:
             # If we're not a master we can't be elected
             printd( "isElected: We're not a masternode, returning False" )
             return False
-        masternodes = getMasternodes()
-        candidates = []
-        for vin, mnstring in masternodes.items():
-            fields = filter( lambda x: x != '', [ f.strip() for f in re.split( r'\s+', mnstring ) ] )
-            if fields[0] != 'ENABLED':
-                continue
-            mnHashVal = computeHashValue( vin )
-            diff = abs( mnHashVal - blockHashVal )
-            crec = { 'vin': vin, 'value': diff }
-            candidates.append( crec )
-        candidates.sort( key = lambda x: x['value'] )
-            
-        if len( candidates ) < 1:
+        electedVin = getElection().winner( getCurrentBlockHash() )
+        if electedVin is None:
             printd( "isElected: No candidates, returning False" )
             return False
 
-        electedVin = candidates[0]['vin']
-
         printd( "isElected: electedVin = ", electedVin )
 
         if electedVin == myvin:
@@ -935,25 +1638,30 @@ class CreateSuperblockTask(SentinelTask):
         event = Event( self.superblock.id )
         event.start_time = misc.get_epoch()
         event.store()
-        printd( "CreateSuperblockTask.submitSuperblock Submitted event: ", str( event.__dict__ ) )
+        printd( "CreateSuperblockTask.submitSuperblock Submitted event: ", str( event.getFieldDict() ) )
         self.superblock.object_status = "SUBMITTED"
         printd( "CreateSuperblockTask.submitSuperblock: Calling store, id = ", self.superblock.id )
         self.superblock.store()
         self.superblock = None
         
-    def superblockCreated( self ):
+    @staticmethod
+    def getSuperblockCreatedSQL():
         sql = "select object_status, event_block_height from governance_object, superblock where "
         sql += "governance_object.id = superblock.governance_object_id and "
         sql += "event_block_height = %s and "
         sql += "object_origin = 'LOCAL' "
+        return sql
+
+    def superblockCreated( self ):
         c = libmysql.db.cursor()
-        c.execute( sql, self.event_block_height )
+        c.execute( CreateSuperblockTask.getSuperblockCreatedSQL(), self.event_block_height )
         rows = c.fetchall()
         if len( rows ) > 0:
             return True
         return False
 
-    def getNewProposalsRanked( self ):
+    @staticmethod
+    def getNewProposalsRankedSQL():
         govTable = GovernanceObject.getTableName()
         propTable = Proposal.getTableName()
         sql = "select "
@@ -961,15 +1669,17 @@ class CreateSuperblockTask(SentinelTask):
         sql += "from %s, %s " % ( propTable, govTable )
         sql += "where %s.id = %s.governance_object_id and " % ( govTable, propTable )
         sql += "object_status = 'NEW' and object_origin = 'REMOTE' and is_valid = 1 and "
-        sql += "%s.absolute_yes_count >= %s " % ( govTable, PROPOSAL_QUORUM )
+        sql += "%s.absolute_yes_count >= " % ( govTable )
+        sql += "%s "
         sql += "ORDER BY %s.absolute_yes_count " % ( govTable )
+        return sql
+
+    def getNewProposalsRanked( self ):
         c = libmysql.db.cursor()
-        c.execute( sql )
+        c.execute( CreateSuperblockTask.getNewProposalsRankedSQL(), ( PROPOSAL_QUORUM, ) )
         rows = c.fetchall()
-        proposals = []
-        for row in rows:
-            proposal = GFACTORY.createFromTable( 'proposal', row[0] )
-            proposals.append( proposal )
+        c.close()
+        proposals = GFACTORY.loadMany( [ row[0] for row in rows ] )
         return proposals
 
     def createSuperblock( self, proposals ):
@@ -1023,161 +1733,377 @@ class AutoVoteTask(SentinelTask):
 
     def voteValidSuperblocks( self ):
         superblocks = self.getValidSuperblocks()
-        for superblock in superblocks:
-            self.vote( superblock, 'funding', 'yes' )
+        self.voteMany( superblocks, 'funding', 'yes' )
 
     def voteInvalidObjects( self ):
         invalidObjects = self.getInvalidObjects()
-        for obj in invalidObjects:
-            self.vote( obj, 'valid', 'no' )
+        self.voteMany( invalidObjects, 'valid', 'no' )
 
     def vote( self, govObj, signal, outcome ):
-        objHash = govObj.object_hash
-        if not misc.is_hash( objHash ):
-            raise( Exception( "AutoVoteTask.vote ERROR: Missing object hash for object: %s" % ( govObj.__dict__ ) ) )
-        command = "gobject vote-conf %s %s %s" % ( objHash, signal, outcome )
-        printd( "vote: command = ", command )
-        rpc_command( command )
-        govObj.object_status = 'VOTED'
-        govObj.store()            
-        
+        self.voteMany( [ govObj ], signal, outcome )
+
+    def voteMany( self, govObjs, signal, outcome ):
+        """Vote on all objects with a single batched rpc request"""
+        calls = []
+        for govObj in govObjs:
+            objHash = govObj.object_hash
+            if not misc.is_hash( objHash ):
+                raise( Exception( "AutoVoteTask.vote ERROR: Missing object hash for object: %s" % ( govObj.getFieldDict() ) ) )
+            calls.append( ( "gobject", [ "vote-conf", objHash, signal, outcome ] ) )
+        printd( "AutoVoteTask.voteMany: signal = %s, outcome = %s, len( govObjs ) = %d" % ( signal, outcome, len( govObjs ) ) )
+        results = rpc_batch( calls )
+        voted = []
+        for govObj, ( result, error ) in zip( govObjs, results ):
+            if error is not None:
+                # Left NEW so the next pass votes again
+                printd( "AutoVoteTask.voteMany: vote failed for %s: %s" % ( govObj.object_hash, error ) )
+                continue
+            govObj.object_status = 'VOTED'
+            voted.append( govObj )
+        GovernanceObject.storeMany( voted )
+
+    @staticmethod
+    def getInvalidObjectsSQL():
+        return "select id from governance_object where is_valid = 0 and object_origin = 'REMOTE' and object_status = 'NEW' "
+
     def getInvalidObjects( self ):
-        sql = "select id from governance_object where is_valid = 0 and object_origin = 'REMOTE' and object_status = 'NEW' "
         c = libmysql.db.cursor()
-        c.execute( sql )
+        c.execute( AutoVoteTask.getInvalidObjectsSQL() )
         rows = c.fetchall()
-        invalidObjects = []
-        for row in rows:
-            govobj = GFACTORY.createById( row[0] )
-            invalidObjects.append( govobj )
+        c.close()
+        invalidObjects = GFACTORY.loadMany( [ row[0] for row in rows ] )
         return invalidObjects
 
-    def getValidSuperblocks( self ):
+    @staticmethod
+    def getValidSuperblocksSQL():
         sql = "select id from governance_object where object_type = %s and "
         sql += "is_valid = 1 and object_origin = 'REMOTE' and object_status = 'NEW' "
+        return sql
+
+    def getValidSuperblocks( self ):
         c = libmysql.db.cursor()
-        c.execute( sql, govtypes.trigger )
+        c.execute( AutoVoteTask.getValidSuperblocksSQL(), govtypes.trigger )
         rows = c.fetchall()
-        superblocks = []
-        for row in rows:
-            govobj = GFACTORY.createById( row[0] )
-            superblocks.append( govobj )
+        c.close()
+        superblocks = GFACTORY.loadMany( [ row[0] for row in rows ] )
         return superblocks
 
 class ProcessEventsTask(SentinelTask):
 
-    def __init__( self ):
-        SentinelTask.__init__( self )
+    """Prepares and submits queued events
 
-    def getEvents( self, prepared ):
-        sql = "select id from event where start_time < NOW() and error_time = 0 and submit_time = 0 "
+    The rpc calls of each step go out over up to nWorkers dashd
+    connections at once (config.event_rpc_workers) and their results are
+    committed together.  Objects whose parent also has a pending event are
+    handled after the parent, and wait for the next run if it failed.
+
+    Events are leased through lib/eventqueue.py, so several sentinels can
+    share one event table.  Failed calls are retried with backoff until
+    the event is dead-lettered.
+    """
+
+    def __init__( self, nWorkers = None ):
+        SentinelTask.__init__( self )
+        if nWorkers is None:
+            nWorkers = getattr( config, 'event_rpc_workers', EVENT_RPC_WORKERS )
+        self.nWorkers = max( 1, nWorkers )
+        # Created on first use, its threads keep their dashd connections
+        self.pool = None
+
+    def claimEvents( self, prepared ):
+        """Claims due events, other sentinels won't see them until they are released"""
         if prepared:
-            sql += " and prepare_time > 0"
-        else:
-            sql += " and prepare_time = 0"
+            # Events whose collateral can't be mature yet stay in the queue
+            return eventqueue.claim( prepared, getBlockCount() )
+        return eventqueue.claim( prepared )
+
+    def getEvents( self, token ):
+        """Loads the events claimed with token"""
         c = libmysql.db.cursor()
-        c.execute( sql )
+        c.execute( eventqueue.get_claimed_sql( Event.getSelectList() ), ( token, ) )
         rows = c.fetchall()
+        c.close()
         events = []
         for row in rows:
             event = Event()
+            event.hydrate( Event, row )
             event.setObjectId( row[0] )
-            event.load()
             events.append( event )
         return events
         
-    def doPrepare( self, event ):
-        printd( "doPrepare: event = ", event.__dict__ )
-        govobj = GFACTORY.createById( event.governance_object_id )
-        printd( "doPrepare: govobj = ", govobj.__dict__ )
-
-        if isinstance( govobj, Superblock ):
-            # Superblocks now require no preparation
-            event.prepare_time = misc.get_epoch()
-            event.store()
-            return
-
-        cmd = "gobject prepare %(object_parent_hash)s %(object_revision)s %(object_creation_time)s %(object_name)s %(object_data)s" % govobj.__dict__
-
-        printd( "doPrepare: cmd = ", cmd )
-
-        result = rpc_command( cmd )
-
-        printd( "doPrepare: result = ", result )
+    def loadEventObjects( self, events ):
+        """Returns [ ( event, govobj ) ], skipping events whose object is gone"""
+        govobjs = GFACTORY.loadMany( [ event.governance_object_id for event in events ] )
+        govobjs = dict( [ ( govobj.id, govobj ) for govobj in govobjs ] )
+        items = []
+        missing = []
+        for event in events:
+            govobj = govobjs.get( event.governance_object_id )
+            if govobj is None:
+                printd( "ProcessEventsTask.loadEventObjects: Warning no governance object for event: ", event.id )
+                # Retrying won't help
+                event.error_time = misc.get_epoch()
+                event.error_message = "governance object %s not found" % event.governance_object_id
+                missing.append( event )
+                continue
+            items.append( ( event, govobj ) )
+        self.releaseEvents( missing )
+        return items
+
+    def getWaves( self, items ):
+        """Splits [ ( event, govobj ) ] into waves processed one after the other
+
+        An object goes in a later wave than its parent when both have an
+        event in items, everything else goes in the first wave.
+        """
+        parentIds = dict( [ ( govobj.id, govobj.parent_id ) for event, govobj in items ] )
+        waves = []
+        for event, govobj in items:
+            nDepth = 0
+            seen = set( [ govobj.id ] )
+            parentId = govobj.parent_id
+            while parentId in parentIds and parentId not in seen:
+                seen.add( parentId )
+                nDepth += 1
+                parentId = parentIds[parentId]
+            while len( waves ) <= nDepth:
+                waves.append( [] )
+            waves[nDepth].append( ( event, govobj ) )
+        return waves
+
+    def callMany( self, calls ):
+        """Runs calls over up to nWorkers dashd connections at once
+
+        The calls are split into one rpc_batch per worker, results are
+        returned in call order.
+        """
+        if len( calls ) <= 1 or self.nWorkers == 1:
+            return self.callChunk( calls )
+        if self.pool is None:
+            self.pool = ThreadPool( self.nWorkers )
+        nChunkSize = ( len( calls ) + self.nWorkers - 1 ) // self.nWorkers
+        chunks = [ calls[i:i + nChunkSize] for i in range( 0, len( calls ), nChunkSize ) ]
+        results = []
+        for chunkResults in self.pool.map( self.callChunk, chunks ):
+            results.extend( chunkResults )
+        return results
+
+    def callChunk( self, calls ):
+        """rpc_batch, an error raised for the chunk fails each of its calls
+
+        Each event then records a failed attempt.  The other chunks keep
+        their results, a prepare which went through has paid its fee.
+        """
+        try:
+            return rpc_batch( calls )
+        except Exception as e:
+            print( "ProcessEventsTask.callChunk: ERROR %d calls failed: %s" % ( len( calls ), e ) )
+            error = e if isinstance( e, RPCError ) else RPCError( -1, str( e ) )
+            return [ ( None, error ) ] * len( calls )
+
+    def failEvent( self, event, message ):
+        """Schedules a retry with backoff, or dead-letters the event"""
+        ( event.attempts, event.next_attempt_time, event.error_time, event.error_message ) = \
+            eventqueue.failure( event.attempts, message, misc.get_epoch() )
+
+    def resetAttempts( self, event ):
+        event.attempts = 0
+        event.next_attempt_time = 0
+        event.error_message = ''
+
+    def releaseEvents( self, events ):
+        rows = [ ( event.prepare_time, event.submit_time, event.error_time, event.error_message,
+                   event.attempts, event.next_attempt_time, event.fee_tx_height, event.maturity_height,
+                   event.id, event.claim_token ) for event in events ]
+        nReleased = eventqueue.release( rows )
+        if nReleased < len( rows ):
+            print( "ProcessEventsTask.releaseEvents: WARNING %d events were claimed by another sentinel after their lease expired" % ( len( rows ) - nReleased ) )
+
+    def storeResults( self, govobjs, events ):
+        """Commits the objects, then writes back and releases the events"""
+        GovernanceObject.storeMany( govobjs )
+        self.releaseEvents( events )
 
-        if misc.is_hash( result ):
-            hashtx = misc.clean_hash( result )
-            printd( " -- got hash:", hashtx )
-            govobj.object_fee_tx = hashtx
-            printd( "doPrepare: Calling govobj.store, govobj =  ", govobj.__dict__ )
-            govobj.store()
-            event.prepare_time = misc.get_epoch()
-            event.store()
-        else:
-            printd( " -- got error:", result )
-            event.error_time = misc.get_epoch()
-            # separately update event error message
-            event.error_message = result
-            event.store()
+    def doPrepare( self, event ):
+        self.prepareEvents( [ event ] )
+
+    def prepareEvents( self, events ):
+        """Prepares events with concurrent batched rpc requests, parents first"""
+        # Objects whose children have to wait for the next run
+        failedIds = set()
+        for wave in self.getWaves( self.loadEventObjects( events ) ):
+            toPrepare = []
+            calls = []
+            storeEvents = []
+            storeObjects = []
+            for event, govobj in wave:
+                printd( "prepareEvents: event = ", event.getFieldDict() )
+                printd( "prepareEvents: govobj = ", govobj.getFieldDict() )
+                # Every claimed event is released, changed or not
+                storeEvents.append( event )
+                if govobj.parent_id in failedIds:
+                    failedIds.add( govobj.id )
+                    continue
+
+                if isinstance( govobj, Superblock ):
+                    # Superblocks now require no preparation
+                    event.prepare_time = misc.get_epoch()
+                    self.resetAttempts( event )
+                    continue
+
+                params = [ "prepare" ] + getObjectCommandParams( govobj )
+                printd( "prepareEvents: params = ", params )
+                toPrepare.append( ( event, govobj ) )
+                calls.append( ( "gobject", params ) )
+
+            results = self.callMany( calls )
+
+            for ( event, govobj ), ( result, error ) in zip( toPrepare, results ):
+                printd( "prepareEvents: result = %s, error = %s" % ( result, error ) )
+                if error is None and misc.is_hash( result ):
+                    hashtx = misc.clean_hash( result )
+                    printd( " -- got hash:", hashtx )
+                    govobj.object_fee_tx = hashtx
+                    storeObjects.append( govobj )
+                    event.prepare_time = misc.get_epoch()
+                    self.resetAttempts( event )
+                    # The fee transaction isn't looked at before it can be mature
+                    ( event.fee_tx_height, event.maturity_height ) = eventqueue.get_maturity( 0, getBlockCount() )
+                else:
+                    message = error.to_cli_text().strip() if error is not None else str( result )
+                    printd( " -- got error:", message )
+                    self.failEvent( event, message )
+                    failedIds.add( govobj.id )
+
+            self.storeResults( storeObjects, storeEvents )
+
+    def trackConfirmations( self, items ):
+        """Returns the ids of objects whose collateral isn't mature or wasn't found
+
+        Fee transactions whose inclusion height isn't known are looked up
+        with one batched rpc request, after that the confirmations follow
+        from the tip and maturity_height.  The events of immature objects
+        are released until the tip reaches their maturity_height.
+        """
+        nHeight = getBlockCount()
+        unknown = [ ( event, govobj ) for event, govobj in items
+                    if not isinstance( govobj, Superblock ) and misc.is_hash( govobj.object_fee_tx ) and event.fee_tx_height == 0 ]
+        txs = {}
+        if len( unknown ) > 0:
+            txs = CTransaction.load_many( [ govobj.object_fee_tx for event, govobj in unknown ] )
+        immatureIds = set()
+        for event, govobj in unknown:
+            tx = txs.get( govobj.object_fee_tx )
+            if tx is None:
+                self.failEvent( event, "fee transaction %s not found" % govobj.object_fee_tx )
+                immatureIds.add( govobj.id )
+                continue
+            ( event.fee_tx_height, event.maturity_height ) = eventqueue.get_maturity( tx.get_confirmations(), nHeight )
+        for event, govobj in items:
+            if event.maturity_height > nHeight:
+                printd( "submitEvents: Waiting for block %d, event = %d" % ( event.maturity_height, event.id ) )
+                immatureIds.add( govobj.id )
+        return immatureIds
 
     def doSubmit( self, event ):
-        govobj = GFACTORY.createById( event.governance_object_id )
-
-        if isinstance( govobj, Superblock ):
-            # Fee no longer needed for Superblocks
-            cmd = "gobject submit %(object_parent_hash)s %(object_revision)s %(object_creation_time)s %(object_name)s %(object_data)s" % govobj.__dict__
-        else:
-            cmd = "gobject submit %(object_parent_hash)s %(object_revision)s %(object_creation_time)s %(object_name)s %(object_data)s %(object_fee_tx)s" % govobj.__dict__
-            if not misc.is_hash( govobj.object_fee_tx ):
-                printd( "doSubmit: Warning no object_fee_tx hash" )
-                return
-
-        printd( "doSubmit: cmd = ", cmd )
-
-        result = rpc_command( cmd )
-
-        printd( "doSubmit: result = ", result )
-
-        if misc.is_hash( result ):
-            event.submit_time = misc.get_epoch()
-            event.store()
-            govobj.object_hash = result
-            govobj.store()
-        # If the submit call did not succeed assume more confirmations needed
-        # so we will try again later.
-        # TODO: Check for other errors here and set the error fields
+        self.submitEvents( [ event ] )
+
+    def submitEvents( self, events ):
+        """Submits events with concurrent batched rpc requests, parents first"""
+        items = self.loadEventObjects( events )
+        immatureIds = self.trackConfirmations( items )
+        # Objects whose children have to wait for the next run
+        failedIds = set()
+        for wave in self.getWaves( items ):
+            toSubmit = []
+            calls = []
+            storeEvents = []
+            storeObjects = []
+            for event, govobj in wave:
+                storeEvents.append( event )
+                if govobj.parent_id in failedIds or govobj.id in immatureIds:
+                    failedIds.add( govobj.id )
+                    continue
+
+                params = [ "submit" ] + getObjectCommandParams( govobj )
+                if not isinstance( govobj, Superblock ):
+                    # Fee no longer needed for Superblocks
+                    if not misc.is_hash( govobj.object_fee_tx ):
+                        printd( "submitEvents: Warning no object_fee_tx hash" )
+                        self.failEvent( event, "no object_fee_tx hash" )
+                        failedIds.add( govobj.id )
+                        continue
+                    params.append( govobj.object_fee_tx )
+
+                printd( "submitEvents: params = ", params )
+                toSubmit.append( ( event, govobj ) )
+                calls.append( ( "gobject", params ) )
+
+            results = self.callMany( calls )
+
+            for ( event, govobj ), ( result, error ) in zip( toSubmit, results ):
+                printd( "submitEvents: result = %s, error = %s" % ( result, error ) )
+                if error is None and misc.is_hash( result ):
+                    event.submit_time = misc.get_epoch()
+                    self.resetAttempts( event )
+                    govobj.object_hash = result
+                    storeObjects.append( govobj )
+                else:
+                    # Retried with backoff until it's dead-lettered, the fee
+                    # transaction is looked up again in case of a reorg
+                    message = error.to_cli_text().strip() if error is not None else str( result )
+                    self.failEvent( event, message )
+                    event.fee_tx_height = 0
+                    event.maturity_height = 0
+                    failedIds.add( govobj.id )
+
+            self.storeResults( storeObjects, storeEvents )
 
     def run( self ):
         printd( "ProcessEventsTask.run START" )
-        toPrepare = self.getEvents( False )
-        printd( "ProcessEventsTask.run Number events to prepare = ", len( toPrepare ) )
-        for event in toPrepare:
-            self.doPrepare( event )
-
-        toSubmit = self.getEvents( True )
-        printd( "ProcessEventsTask.run Number events to submit = ", len( toSubmit ) )
-        for event in toSubmit:
-            self.doSubmit( event )
+        token = self.claimEvents( False )
+        try:
+            toPrepare = self.getEvents( token )
+            printd( "ProcessEventsTask.run Number events to prepare = ", len( toPrepare ) )
+            self.prepareEvents( toPrepare )
+        finally:
+            # Events which weren't written back go back to the queue
+            eventqueue.unclaim( token )
+
+        token = self.claimEvents( True )
+        try:
+            toSubmit = self.getEvents( token )
+            printd( "ProcessEventsTask.run Number events to submit = ", len( toSubmit ) )
+            self.submitEvents( toSubmit )
+        finally:
+            eventqueue.unclaim( token )
 
 def testSentinel1():
     printd( "testSentinel1: Start" )
     sentineld = SentinelDaemon()
-    taskList = SentinelTaskList( GOVERNANCE_UPDATE_PERIOD_SECONDS )
-    taskList.addTask( UpdateGovernanceTask() )
-    taskList.addTask( CreateSuperblockTask() )
-    taskList.addTask( AutoVoteTask() )
-    sentineld.addTask( taskList )
+    updateTask = UpdateGovernanceTask()
+    createTask = CreateSuperblockTask()
+    voteTask = AutoVoteTask()
+    for task in ( updateTask, createTask, voteTask ):
+        if sentineld.listener is not None:
+            # Only sync when something happened, the timer is a fallback
+            task.setSchedule( GOVERNANCE_FALLBACK_SYNC_SECONDS, ( 'block', 'governance' ) )
+        else:
+            task.setSchedule( GOVERNANCE_UPDATE_PERIOD_SECONDS )
+    sentineld.addTask( updateTask )
+    sentineld.addTask( createTask, [ updateTask ] )
+    sentineld.addTask( voteTask, [ createTask ] )
+    # Runs alongside the governance tasks
     sentineld.addTask( ProcessEventsTask() )
     sentineld.run()
 
 if __name__ == "__main__":
 
-    govobjs = getGovernanceObjects()
-    
-    for (key,gobj) in govobjs.items():
+    for (key,gobj) in iterGovernanceObjects():
         printd( "key = ", key )
 
-    getMasternodes()
+    for (vin,mnstring) in iterMasternodes():
+        pass
 
     printd( "My VIN: ", getMyVin() )
 
@@ -1,23 +1,59 @@
 #!/usr/bin/env python
 
-import json
-import dashd
+"""
+    - ran by dashd for every new block, tells sentineld about the new chain tip
 
-import sys
-sys.path.append("lib")
+    add to dash.conf:
 
-from governance  import GovernanceObject
+        blocknotify=/path/to/sentinel/scripts/blocknotify.py %s
 
-"""
-    - this script is ran ~2.5/minutes and processes updates to the governance system 
+    the block hash is sent to the daemon through config.notify_socket, which
+    wakes it to sync governance objects and check for superblocks straight
+    away. it's also written to config.block_tip_file, sentineld drops the
+    values it cached for the previous block (block height and hash,
+    masternode list, own vin, budget) when the file changes
+
+    "blocknotify.py governance" wakes the daemon for a governance change
 
 """
 
-difflist = json.loads(dashd.cmd("governance diff"))
-for item in difflist:
-	obj = GovernanceObject(item)
-	obj.save()
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(os.path.realpath(__file__)), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "lib")))
+
+import config
+import notify
+
+def write_tip(path, block_hash):
+    # write then rename, so readers never see a partial hash
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(block_hash + "\n")
+    os.rename(tmp, path)
+
+def main():
+    if len(sys.argv) < 2:
+        print "usage: blocknotify.py <block hash> | governance"
+        return 1
+    tip_file = getattr(config, "block_tip_file", None)
+    notify_socket = getattr(config, "notify_socket", None)
+    if tip_file is None and notify_socket is None:
+        print "blocknotify.py: neither block_tip_file nor notify_socket is set in config.py"
+        return 1
+
+    if sys.argv[1] == "governance":
+        kind, data = "governance", ""
+    else:
+        kind, data = "block", sys.argv[1]
+        if tip_file is not None:
+            write_tip(tip_file, data)
+
+    if notify_socket is not None:
+        # the daemon may not be running, it reads the tip file when it starts
+        notify.send(notify_socket, kind, data)
+    return 0
 
-	if obj.is_valid():
-		obj.vote(VOTE_ACTION_VALID, VOTE_OUTCOME_NO)
-pass
\ No newline at end of file
+if __name__ == '__main__':
+    sys.exit(main())
@@ -16,6 +16,7 @@ import misc
 import dashd
 import random
 import govtypes
+import eventqueue
 
 """
  
@@ -36,8 +37,6 @@ import govtypes
 
 """
 
-CONFIRMATIONS_REQUIRED = 7
-
 def clear_events():
     sql = "delete from event"
     libmysql.db.query(sql)
@@ -72,16 +71,47 @@ def reset():
     clear_superblocks()
     clear_proposals()	
 
-def prepare_events():
-    sql = "select id from event where start_time < NOW() and error_time = 0 and prepare_time = 0"
-
+def claim_events(prepared, height):
+    """ claims due events, returns (token, [(id, attempts, fee_tx_height, maturity_height), ...]) """
+    token = eventqueue.claim(prepared, height)
     c = libmysql.db.cursor()
-    c.execute( sql )
+    c.execute(eventqueue.get_claimed_sql("id, attempts, fee_tx_height, maturity_height"), (token,))
     rows = c.fetchall()
+    c.close()
+    return token, rows
+
+def load_event(row):
+    event = Event()
+    event.load(row[0])
+    event.update_field("fee_tx_height", row[2])
+    event.update_field("maturity_height", row[3])
+    return event
+
+def release_event(event, token, attempts = 0, next_attempt_time = 0, error_time = 0, error_message = ""):
+    """ writes back the event and frees it """
+    eventqueue.release([(event.event["prepare_time"], event.event["submit_time"], error_time, error_message,
+                         attempts, next_attempt_time, event.event["fee_tx_height"], event.event["maturity_height"],
+                         event.event["id"], token)])
+
+def fail_event(event, attempts, token, message):
+    """ records a failed attempt, retried with backoff until it's dead-lettered """
+    attempts, next_attempt_time, error_time, error_message = eventqueue.failure(attempts, message, misc.get_epoch())
+    release_event(event, token, attempts, next_attempt_time, error_time, error_message)
 
+def prepare_events():
+    height = dashd.rpc_call("getblockcount")
+    token, rows = claim_events(False, height)
+    try:
+        return prepare_claimed(token, rows, height)
+    finally:
+        # events which weren't handled go back to the queue
+        eventqueue.unclaim(token)
+
+def prepare_claimed(token, rows, height):
+    """ prepares every claimed event, returns how many succeeded """
+    prepared = 0
     for row in rows:
-        event = Event()
-        event.load(row[0])
+        event = load_event(row)
 
         govobj = GovernanceObject()
         govobj.load(event.get_id())
@@ -100,36 +130,48 @@ def prepare_events():
             print " -- got hash:", hashtx
             govobj.update_field("object_fee_tx", hashtx)
             govobj.save()
-            event.update_field("prepare_time", misc.get_epoch())
-            event.save()
             libmysql.db.commit()
-
-            return 1
+            event.update_field("prepare_time", misc.get_epoch())
+            # no need to look at the fee transaction before it can be mature
+            fee_tx_height, maturity_height = eventqueue.get_maturity(0, height)
+            event.update_field("maturity_height", maturity_height)
+            release_event(event, token)
+            prepared += 1
         else:
             print " -- got error:", result
-            event.update_field("error_time", misc.get_epoch())
-            event.save()
-            # separately update event error message
-            event.update_error_message(result)
-            libmysql.db.commit()
+            fail_event(event, row[1], token, result)
 
-    return 0
+    return prepared
 
 
 def submit_events():
-    sql = "select id from event where start_time < NOW() and prepare_time < NOW() and prepare_time > 0 and submit_time = 0"
-
-    c = libmysql.db.cursor()
-    c.execute( sql )
-    rows = c.fetchall()
-
+    # only events whose collateral can be mature by now are claimed
+    height = dashd.rpc_call("getblockcount")
+    token, rows = claim_events(True, height)
+    try:
+        return submit_claimed(token, rows, height)
+    finally:
+        eventqueue.unclaim(token)
+
+def submit_claimed(token, rows, height):
+    """ submits every claimed event whose collateral is mature, returns how many succeeded """
+    submitted = 0
+    pending = []
     for row in rows:
-        event = Event()
-        event.load(row[0])
+        event = load_event(row)
 
         govobj = GovernanceObject()
         print event.get_id()
         govobj.load(event.get_id())
+        pending.append((event, govobj, row[1]))
+
+    # fetch the fee transactions whose inclusion height isn't known yet in one
+    # batched rpc request, once it is their confirmations follow from the tip
+    hashes = [govobj.get_field("object_fee_tx") for (event, govobj, attempts) in pending
+              if event.event["fee_tx_height"] == 0]
+    txs = dashd.CTransaction.load_many([h for h in hashes if misc.is_hash(h)])
+
+    for (event, govobj, attempts) in pending:
         hash = govobj.get_field("object_fee_tx")
 
         print "# SUBMIT PREPARED EVENTS FOR DASH NETWORK"
@@ -140,29 +182,41 @@ def submit_events():
         print " -- executing event ... getting fee_tx hash"
 
         if misc.is_hash(hash):
-            tx = dashd.CTransaction()
-            if tx.load(hash):
+            if event.event["fee_tx_height"] == 0:
+                tx = txs.get(hash)
+                if tx is None:
+                    fail_event(event, attempts, token, "fee transaction %s not found" % hash)
+                    continue
                 print " -- confirmations: ", tx.get_confirmations()
-                
-                if tx.get_confirmations() >= CONFIRMATIONS_REQUIRED:
-                    event.set_submitted()   
-                    print " -- executing event ... getting fee_tx hash"
-
-                    result = dashd.rpc_command(govobj.get_submit_command())
-                    if misc.is_hash(result):
-                        print " -- got result", result
-
-                        govobj.update_field("object_hash", result)
-                        event.save()
-                        govobj.save()
-                        libmysql.db.commit()
-                        return 1
-                    else:
-                        print " -- got error", result
+                fee_tx_height, maturity_height = eventqueue.get_maturity(tx.get_confirmations(), height)
+                event.update_field("fee_tx_height", fee_tx_height)
+                event.update_field("maturity_height", maturity_height)
+
+            if event.event["maturity_height"] <= height:
+                event.set_submitted()   
+                print " -- executing event ... getting fee_tx hash"
+
+                result = dashd.rpc_command(govobj.get_submit_command())
+                if misc.is_hash(result):
+                    print " -- got result", result
+
+                    govobj.update_field("object_hash", result)
+                    govobj.save()
+                    libmysql.db.commit()
+                    release_event(event, token)
+                    submitted += 1
                 else:
-                    print " -- waiting for confirmation"
-
-        return 0
+                    print " -- got error", result
+                    # look at the fee transaction again before the next attempt
+                    event.update_field("submit_time", 0)
+                    event.update_field("fee_tx_height", 0)
+                    event.update_field("maturity_height", 0)
+                    fail_event(event, attempts, token, result)
+            else:
+                print " -- waiting for confirmation until block", event.event["maturity_height"]
+                release_event(event, token, attempts)
+
+    return submitted
 
 #
 # AUTONOMOUS VOTING 
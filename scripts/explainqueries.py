@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+
+"""
+    scripts/explainqueries.py
+    -------------------------------
+
+    EXPLAINs every query the daemon runs against its WHERE clauses and
+    exits with an error if any of them falls back to a full table or
+    index scan. An UPDATE ... ORDER BY id LIMIT which walks the primary key
+    instead of idx_pending shows up as a full index scan. UPDATEs are
+    EXPLAINed as they are run, which needs MySQL 5.6 or later.
+
+    Run it against a scratch database holding a realistic amount of data,
+    MySQL prefers full scans on small tables regardless of indexes.
+    --populate N fills the configured database with N synthetic governance
+    objects first (never use it on a production database).
+
+    usage: python scripts/explainqueries.py [--populate N]
+"""
+
+import sys
+import random
+import argparse
+
+sys.path.append("lib")
+
+import libmysql
+import govtypes
+import eventqueue
+# connects to the configured database
+from sentineld import AutoVoteTask, CreateSuperblockTask, Event, GovernanceFactory, GovernanceObject, Proposal, Superblock
+
+# ( source, sql, params ) for each query with a WHERE clause run by
+# lib/sentineld.py, lib/eventqueue.py and scripts/crontab.py.  The SQL is
+# taken from the code which runs it, so the check follows the queries.
+QUERIES = [
+    ( "GovernanceObject.getRemoteObjectIndex",
+      GovernanceObject.getRemoteObjectIndexSQL(),
+      () ),
+    ( "GovernanceObject.existsInDb",
+      GovernanceObject.getExistsSQL(),
+      ( "00" * 32, ) ),
+    ( "GovernanceObject.updateVoteCounts",
+      GovernanceObject.getUpdateVoteCountsSQL(),
+      ( 0, 0, 0, "00" * 32 ) ),
+    ( "GovernanceObject.getRemoteObjectIds",
+      GovernanceObject.getRemoteObjectIdsSQL(2),
+      ( "00" * 32, "11" * 32 ) ),
+    ( "Superblock.isValid",
+      Superblock.getLocalMatchSQL(),
+      ( 1000, ) ),
+    ( "CreateSuperblockTask.superblockCreated",
+      CreateSuperblockTask.getSuperblockCreatedSQL(),
+      ( 1000, ) ),
+    ( "CreateSuperblockTask.getNewProposalsRanked",
+      CreateSuperblockTask.getNewProposalsRankedSQL(),
+      ( 0, ) ),
+    ( "AutoVoteTask.getInvalidObjects",
+      AutoVoteTask.getInvalidObjectsSQL(),
+      () ),
+    ( "AutoVoteTask.getValidSuperblocks",
+      AutoVoteTask.getValidSuperblocksSQL(),
+      ( govtypes.trigger, ) ),
+    ( "GovernanceFactory.loadMany( Proposal )",
+      GovernanceFactory.getLoadManySQL(Proposal, 2),
+      ( 1, 2 ) ),
+    ( "GovernanceFactory.loadMany( Superblock )",
+      GovernanceFactory.getLoadManySQL(Superblock, 2),
+      ( 1, 2 ) ),
+    ( "eventqueue.claim( prepared = False )",
+      eventqueue.get_claim_sql(False),
+      ( "00" * 16, 1600, 1000, 1000, 1000, 100 ) ),
+    ( "eventqueue.claim( prepared = True )",
+      eventqueue.get_claim_sql(True),
+      ( "00" * 16, 1600, 500000, 1000, 1000, 1000, 100 ) ),
+    # crontab.claim_events selects fewer columns with the same clauses
+    ( "ProcessEventsTask.getEvents / crontab.claim_events",
+      eventqueue.get_claimed_sql(Event.getSelectList()),
+      ( "00" * 16, ) ),
+    ( "eventqueue.release",
+      eventqueue.RELEASE_SQL,
+      ( 0, 0, 0, "", 0, 0, 0, 0, 1, "00" * 16 ) ),
+    ( "eventqueue.unclaim",
+      eventqueue.UNCLAIM_SQL,
+      ( "00" * 16, ) ),
+]
+
+def populate(count):
+    """ insert count synthetic governance objects plus their proposals, superblocks and events """
+    rng = random.Random(0)
+    c = libmysql.db.cursor()
+    c.execute("select coalesce(max(id), 0) from governance_object")
+    first_id = c.fetchone()[0] + 1
+    govobjs = []
+    proposals = []
+    superblocks = []
+    events = []
+    for i in range(count):
+        object_id = first_id + i
+        local = rng.random() < 0.05
+        trigger = rng.random() < 0.1
+        object_type = govtypes.trigger if trigger else govtypes.proposal
+        status = rng.choice(["VOTED"] * 8 + ["NEW", "SUBMITTED"])
+        yes = rng.randint(0, 500)
+        govobjs.append((object_id, "%064x" % rng.getrandbits(256), "fixture-%d" % object_id, object_type, "",
+                        status, "LOCAL" if local else "REMOTE", rng.randint(0, 1), yes, yes, 0))
+        if trigger:
+            superblocks.append((object_id, "sb%d" % object_id, rng.randint(0, 100000), "", ""))
+        else:
+            proposals.append((object_id, "fixture-%d" % object_id, 0, 0, "", 0))
+        if local:
+            done = rng.random() < 0.95
+            events.append((object_id, 1, 1 if done else 0, 1 if done else 0))
+    c.executemany("insert into governance_object (id, object_hash, object_name, object_type, object_data, "
+                  "object_status, object_origin, is_valid, absolute_yes_count, yes_count, no_count) "
+                  "values (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)", govobjs)
+    c.executemany("insert into proposal (governance_object_id, proposal_name, start_epoch, end_epoch, "
+                  "payment_address, payment_amount) values (%s, %s, %s, %s, %s, %s)", proposals)
+    c.executemany("insert into superblock (governance_object_id, superblock_name, event_block_height, "
+                  "payment_addresses, payment_amounts) values (%s, %s, %s, %s, %s)", superblocks)
+    c.executemany("insert into event (governance_object_id, start_time, prepare_time, submit_time) "
+                  "values (%s, %s, %s, %s)", events)
+    c.execute("analyze table governance_object, proposal, superblock, event")
+    c.fetchall()
+    c.close()
+    libmysql.db.commit()
+
+def explain(sql, params):
+    """ returns the EXPLAIN output rows as dictionaries """
+    c = libmysql.db.cursor()
+    c.execute("explain " + sql, params)
+    names = [d[0] for d in c.description]
+    rows = [dict(zip(names, row)) for row in c.fetchall()]
+    c.close()
+    return rows
+
+def check():
+    failures = 0
+    for source, sql, params in QUERIES:
+        for row in explain(sql, params):
+            full_scan = row["type"] in ("ALL", "index")
+            if full_scan:
+                failures += 1
+            print "%-4s %-70s %-18s %-6s %-28s %s" % ("FAIL" if full_scan else "ok", source, row["table"],
+                                                      row["type"], row["key"], row["rows"])
+    return failures
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Check that daemon queries use indexes")
+    parser.add_argument("--populate", type = int, default = 0, metavar = "N",
+                        help = "first insert N synthetic governance objects (scratch databases only)")
+    args = parser.parse_args()
+
+    if args.populate > 0:
+        populate(args.populate)
+    failures = check()
+    if failures > 0:
+        print "%d full scan(s) found" % failures
+        sys.exit(1)
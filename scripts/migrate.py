@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+
+"""
+    scripts/migrate.py
+    -------------------------------
+
+    Applies the numbered schema files in database/ (001.sql, 002.sql, ...)
+    which haven't been applied yet, recording each one in the
+    schema_migration table.
+
+    Databases created by importing 001.sql by hand are detected and 001
+    is recorded as applied without running it (it drops all tables).
+
+    usage: python scripts/migrate.py [--dry-run]
+"""
+
+import sys
+import os
+import re
+import time
+import argparse
+
+sys.path.append("lib")
+
+import libmysql
+import config
+
+dir_path = os.path.dirname(os.path.realpath(__file__))
+MIGRATIONS_DIR = os.path.abspath(os.path.join(dir_path, "..", "database"))
+
+def get_migrations():
+    """ returns [(version, path), ...] sorted by version """
+    migrations = []
+    for name in os.listdir(MIGRATIONS_DIR):
+        m = re.match(r'^(\d+)\.sql$', name)
+        if m:
+            migrations.append((int(m.group(1)), os.path.join(MIGRATIONS_DIR, name)))
+    migrations.sort()
+    return migrations
+
+def split_statements(sql):
+    """ split a schema file into statements, dropping /* */ comments """
+    sql = re.sub(r'/\*.*?\*/', '', sql, flags=re.DOTALL)
+    return [stmt.strip() for stmt in sql.split(";") if stmt.strip() != ""]
+
+def table_exists(name):
+    c = libmysql.db.cursor()
+    c.execute("show tables like %s", (name,))
+    row = c.fetchone()
+    c.close()
+    return row is not None
+
+def get_applied():
+    c = libmysql.db.cursor()
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS `schema_migration` (
+          `version` int(11) unsigned NOT NULL,
+          `applied_time` int(11) NOT NULL DEFAULT '0',
+          PRIMARY KEY (`version`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8
+    """)
+    c.execute("select version from schema_migration")
+    applied = set([row[0] for row in c.fetchall()])
+    c.close()
+    return applied
+
+def record(version):
+    c = libmysql.db.cursor()
+    c.execute("insert into schema_migration (version, applied_time) values (%s, %s)", (version, int(time.time())))
+    c.close()
+    libmysql.db.commit()
+
+def migrate(dry_run = False):
+    applied = get_applied()
+
+    if len(applied) == 0 and table_exists("governance_object"):
+        print "existing schema found, recording 001.sql as applied"
+        if not dry_run:
+            record(1)
+        applied.add(1)
+
+    pending = [(version, path) for (version, path) in get_migrations() if version not in applied]
+    if len(pending) == 0:
+        print "schema is up to date"
+        return 0
+
+    for version, path in pending:
+        print "applying %s" % os.path.basename(path)
+        with open(path) as f:
+            statements = split_statements(f.read())
+        if dry_run:
+            for stmt in statements:
+                print stmt + ";"
+                print
+            continue
+        c = libmysql.db.cursor()
+        for stmt in statements:
+            c.execute(stmt)
+        c.close()
+        record(version)
+
+    return len(pending)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Apply pending sentinel schema migrations")
+    parser.add_argument("--dry-run", action = "store_true", help = "print pending statements without running them")
+    args = parser.parse_args()
+
+    libmysql.connect(config.hostname, config.username, config.password, config.database)
+    migrate(args.dry_run)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+
+"""
+Micro-benchmarks for lib/base58_dash.py
+
+Checks that the pure Python and gmpy2 (when installed) conversions give
+the same bytes as the original implementation, then times encode,
+decode and address validation for each of them.
+
+    python test/base58Bench.py [--number 20000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import timeit
+sys.path.append("lib")
+
+dir_path = os.path.dirname(os.path.realpath(__file__))
+
+sys.path.append( os.path.abspath( os.path.join( dir_path, "..", "lib" ) ) )
+
+import base58_dash as base58
+
+ADDRESS = "yNaE8Le2MVwk1zpwuEKveTMCEQHVxdcfCS"
+
+def legacy_b58encode(v):
+    """ the original quadratic encoder, as the reference """
+    chars = base58.b58chars
+    long_value = 0
+    for (i, c) in enumerate(v[::-1]):
+        long_value += (256**i) * ord(c)
+    result = ''
+    while long_value >= 58:
+        div, mod = divmod(long_value, 58)
+        result = chars[mod] + result
+        long_value = div
+    result = chars[long_value] + result
+    nPad = 0
+    for c in v:
+        if c == '\0': nPad += 1
+        else: break
+    return (chars[0]*nPad) + result
+
+def legacy_b58decode(v):
+    chars = base58.b58chars
+    long_value = 0
+    for (i, c) in enumerate(v[::-1]):
+        long_value += chars.find(c) * (58**i)
+    result = ''
+    while long_value >= 256:
+        div, mod = divmod(long_value, 256)
+        result = chr(mod) + result
+        long_value = div
+    result = chr(long_value) + result
+    nPad = 0
+    for c in v:
+        if c == chars[0]: nPad += 1
+        else: break
+    return chr(0)*nPad + result
+
+def samples(rng):
+    values = ["", "\0", "\0\0", "\0\1", "o hai"]
+    for n in (1, 2, 21, 25, 100, 1000):
+        for i in range(20):
+            values.append("".join(chr(rng.choice((0, rng.randint(0, 255)))) for j in range(n)))
+    return values
+
+def check(values):
+    for v in values:
+        encoded = legacy_b58encode(v)
+        assert base58.b58encode(v) == encoded, repr(v)
+        assert base58.b58decode(encoded) == legacy_b58decode(encoded), repr(encoded)
+
+def bench(name, number, payloads):
+    for label, payload in payloads:
+        encoded = base58.b58encode(payload)
+        for op, func, arg in (("encode", base58.b58encode, payload),
+                              ("decode", base58.b58decode, encoded)):
+            seconds = timeit.timeit(lambda: func(arg), number = number)
+            print "%-8s %-8s %-6s %8.2f us" % (name, label, op, seconds * 1e6 / number)
+    seconds = timeit.timeit(lambda: base58.get_bcaddress_version(ADDRESS), number = number)
+    print "%-8s %-8s %-6s %8.2f us" % (name, "address", "check", seconds * 1e6 / number)
+
+def main():
+    parser = argparse.ArgumentParser(description = "base58 micro-benchmarks")
+    parser.add_argument("--number", type = int, default = 20000, help = "calls per measurement")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    values = samples(rng)
+    address = base58.b58decode(ADDRESS)
+    payloads = [("address", address), ("1kB", "".join(chr(rng.randint(0, 255)) for i in range(1024)))]
+
+    gmpy2 = base58.gmpy2
+    implementations = [("python", None)]
+    if gmpy2 is not None:
+        implementations.append(("gmpy2", gmpy2))
+    else:
+        print "gmpy2 isn't installed, only timing the pure Python conversion"
+
+    for name, module in implementations:
+        base58.gmpy2 = module
+        check(values)
+        bench(name, args.number, payloads)
+    base58.gmpy2 = gmpy2
+
+    for label, payload in payloads:
+        encoded = legacy_b58encode(payload)
+        number = max(1, args.number // 10)
+        for op, func, arg in (("encode", legacy_b58encode, payload), ("decode", legacy_b58decode, encoded)):
+            seconds = timeit.timeit(lambda: func(arg), number = number)
+            print "%-8s %-8s %-6s %8.2f us" % ("legacy", label, op, seconds * 1e6 / number)
+
+if __name__ == '__main__':
+    main()
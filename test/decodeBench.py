@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+
+"""
+Decoding of gobject list records
+
+Times building model objects from a synthetic gobject list response,
+decoding each record's payload twice as UpdateGovernanceTask used to
+(DataString for the subtype, then DataHex again in loadJSONFields)
+against the single decode of GovernanceFactory.createFromRecord.
+
+    python test/decodeBench.py [--proposals 10000] [--repeat 3]
+"""
+
+import argparse
+import binascii
+import json
+import os
+import sys
+import time
+sys.path.append("lib")
+
+dir_path = os.path.dirname(os.path.realpath(__file__))
+
+sys.path.append( os.path.abspath( os.path.join( dir_path, ".." ) ) )
+sys.path.append( dir_path )
+
+import fakedashd
+from sentineld import GFACTORY
+
+def decode_twice(govobjs):
+    objs = []
+    for key, rec in govobjs.items():
+        subtype = json.loads(rec['DataString'])[0][0]
+        govobj = GFACTORY.create(subtype, rec['Name'])
+        govobj.loadJSON(rec, json.loads(binascii.unhexlify(rec['DataHex']))[0][1])
+        objs.append(govobj)
+    return objs
+
+def decode_once(govobjs):
+    return [GFACTORY.createFromRecord(rec) for key, rec in govobjs.items()]
+
+def best_time(func, govobjs, repeat):
+    best = None
+    for i in range(repeat):
+        start = time.time()
+        func(govobjs)
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description = "gobject list decoding benchmark")
+    parser.add_argument("--proposals", type = int, default = 10000)
+    parser.add_argument("--triggers", type = int, default = 100)
+    parser.add_argument("--repeat", type = int, default = 3)
+    args = parser.parse_args()
+
+    chain = fakedashd.make_chain(args.proposals, args.triggers, 0)
+    # the response as rpc_call returns it
+    govobjs = json.loads(json.dumps(chain.gobject_list()))
+
+    once = [govobj.getJSON() for govobj in decode_once(govobjs)]
+    twice = [govobj.getJSON() for govobj in decode_twice(govobjs)]
+    assert once == twice
+
+    old = best_time(decode_twice, govobjs, args.repeat)
+    new = best_time(decode_once, govobjs, args.repeat)
+    print "%d records" % len(govobjs)
+    print "decode twice %8.3f s %8.1f us/record" % (old, old * 1e6 / len(govobjs))
+    print "decode once  %8.3f s %8.1f us/record (%.0f%% faster)" % (new, new * 1e6 / len(govobjs), 100.0 * (old - new) / old)
+
+if __name__ == '__main__':
+    main()
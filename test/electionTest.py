@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+
+"""
+Checks that the NumPy election path gives the same results as the pure
+Python one: limb distances against Python integers (including carries
+across limbs and equal values), then winners, rankings and ranks for
+random masternode lists and block hashes.
+
+    python test/electionTest.py [--masternodes 4000] [--blocks 200]
+"""
+
+import argparse
+import os
+import random
+import sys
+sys.path.append("lib")
+
+dir_path = os.path.dirname(os.path.realpath(__file__))
+
+sys.path.append( os.path.abspath( os.path.join( dir_path, "..", "lib" ) ) )
+
+import election
+from election import Election
+
+def limbs_to_int(row):
+    value = 0
+    for limb in row:
+        value = (value << 64) | int(limb)
+    return value
+
+def check_distances(rng):
+    numpy = election.numpy
+    edge = [0, 1, (1 << 64) - 1, 1 << 64, (1 << 128) - 1, 1 << 192, (1 << 256) - 1, (1 << 255)]
+    values = edge + [rng.getrandbits(256) for i in range(500)]
+    limbs = numpy.array([election.to_limbs(v) for v in values], dtype = numpy.uint64)
+    for block_value in edge + [rng.getrandbits(256) for i in range(50)] + values[-5:]:
+        distances = election.limb_distances(limbs, block_value)
+        for row, value in zip(distances, values):
+            assert limbs_to_int(row) == abs(value - block_value)
+        expected = min(range(len(values)), key = lambda i: (abs(values[i] - block_value), i))
+        assert election.limb_argmin(distances) == expected
+    print "limb distances: ok"
+
+def check_elections(rng, n, blocks):
+    vins = ["%064x-%d" % (rng.getrandbits(256), rng.randint(0, 3)) for i in range(n)]
+    fast = Election(use_numpy = True)
+    slow = Election(use_numpy = False)
+    for e in (fast, slow):
+        e.update(vins)
+    block_hashes = ["%064x" % rng.getrandbits(256) for i in range(blocks)]
+    assert fast.winners(block_hashes) == slow.winners(block_hashes)
+    for block_hash in block_hashes[:10]:
+        assert fast.ranking(block_hash) == slow.ranking(block_hash)
+        assert fast.top(block_hash, 10) == slow.top(block_hash, 10)
+        vin = rng.choice(vins)
+        assert fast.rank(block_hash, vin) == slow.rank(block_hash, vin)
+
+    # the limb matrix follows changes to the enabled set
+    changed = vins[n // 10:] + ["%064x-0" % rng.getrandbits(256) for i in range(n // 20)]
+    for e in (fast, slow):
+        e.update(changed)
+    assert fast.winners(block_hashes) == slow.winners(block_hashes)
+    print "elections (%d masternodes, %d blocks): ok" % (n, blocks)
+
+def main():
+    parser = argparse.ArgumentParser(description = "NumPy vs pure Python election results")
+    parser.add_argument("--masternodes", type = int, default = 4000)
+    parser.add_argument("--blocks", type = int, default = 200)
+    args = parser.parse_args()
+
+    if election.numpy is None:
+        print "NumPy isn't installed, nothing to compare"
+        return 0
+    rng = random.Random(0)
+    check_distances(rng)
+    check_elections(rng, args.masternodes, args.blocks)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
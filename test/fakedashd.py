@@ -0,0 +1,420 @@
+#!/usr/bin/env python
+
+"""
+    Fake dashd
+    ----
+
+    A scriptable stand-in for dashd's JSON-RPC interface, serving generated
+    governance objects, masternodes and blocks so the daemon's hot paths
+    can be run and benchmarked without a live node.
+
+    Supported calls:
+
+        getinfo, getblockcount, getbestblockhash, getblockhash,
+        getblockchaininfo, getblockheader, gettransaction, masternode status, masternodelist full,
+        gobject list | diff | prepare | submit | vote-conf
+
+    Control calls (not part of dashd):
+
+        generate <n>          advance the chain by n blocks
+        setlatency <ms>       delay every reply by ms milliseconds
+
+    Usage:
+
+        python test/fakedashd.py --proposals 10000 --masternodes 4000 \\
+            --datadir /tmp/fakedash --latency 5
+
+    --datadir writes a dash.conf pointing at the fake server, so setting
+    config.datadir to the same directory makes sentinel use it.
+"""
+
+import sys
+import os
+import argparse
+import binascii
+import hashlib
+import json
+import random
+import threading
+import time
+import BaseHTTPServer
+import SocketServer
+
+dir_path = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.abspath(os.path.join(dir_path, "..", "lib")))
+
+import base58_dash as base58
+
+MAINNET_ADDRESS_VERSION = 76
+TESTNET_ADDRESS_VERSION = 140
+PROTOCOL_VERSION = 70201
+
+def sha256_hex(data):
+    return hashlib.sha256(data).hexdigest()
+
+def make_address(rng, version):
+    payload = chr(version) + "".join(chr(rng.randint(0, 255)) for i in range(20))
+    return base58.b58encode_chk(payload)
+
+class FakeChain():
+
+    """ all state served by the fake dashd, safe to share between server threads """
+
+    def __init__(self, seed = 0, testnet = True, height = 1000, latency = 0.0):
+        self.rng = random.Random(seed)
+        self.lock = threading.RLock()
+        self.testnet = testnet
+        self.latency = latency
+        self.height = height
+        self.govobjs = {}
+        self.masternodes = {}
+        self.my_vin = None
+        self.txs = {}
+        self.votes = []
+        self.list_cache = None
+        self.diff_seen = set()
+
+    # ---- fixtures
+
+    def address_version(self):
+        return TESTNET_ADDRESS_VERSION if self.testnet else MAINNET_ADDRESS_VERSION
+
+    def random_hash(self):
+        return "%064x" % self.rng.getrandbits(256)
+
+    def add_govobj(self, subtype, name, fields, yes = 0, no = 0):
+        fields = dict(fields)
+        fields["type"] = 1 if subtype == "proposal" else 2
+        data_string = json.dumps([(subtype, fields)], sort_keys = True)
+        data_hex = binascii.hexlify(data_string)
+        obj_hash = sha256_hex(data_hex + name)
+        with self.lock:
+            self.govobjs[obj_hash] = {
+                "DataHex" : data_hex,
+                "DataString" : data_string,
+                "Hash" : obj_hash,
+                "CollateralHash" : self.random_hash(),
+                "Name" : name,
+                "CreationTime" : int(time.time()),
+                "AbsoluteYesCount" : yes - no,
+                "YesCount" : yes,
+                "NoCount" : no,
+                "AbstainCount" : 0,
+                "fBlockchainValidity" : True,
+                "IsValidReason" : "",
+                "fCachedValid" : True,
+                "fCachedFunding" : False,
+                "fCachedDelete" : False,
+                "fCachedEndorsed" : False,
+            }
+            self.list_cache = None
+        return obj_hash
+
+    def generate_proposals(self, count, invalid_fraction = 0.1):
+        now = int(time.time())
+        for i in range(count):
+            address = make_address(self.rng, self.address_version())
+            if self.rng.random() < invalid_fraction:
+                # spam: garbage payment address
+                address = "X" + binascii.hexlify(os.urandom(16))
+            fields = {
+                "proposal_name" : "prop-%d-%d" % (i, self.rng.randint(1000000, 9999999)),
+                "start_epoch" : now - 86400,
+                "end_epoch" : now + 86400 * 30 * self.rng.randint(1, 12),
+                "payment_address" : address,
+                "payment_amount" : "%.3f" % (self.rng.randint(1, 100000) / 1000.0),
+            }
+            self.add_govobj("proposal", fields["proposal_name"], fields,
+                            yes = self.rng.randint(0, 500), no = self.rng.randint(0, 100))
+
+    def generate_triggers(self, count, cycle = 24):
+        for i in range(count):
+            payments = self.rng.randint(1, 5)
+            addresses = [make_address(self.rng, self.address_version()) for j in range(payments)]
+            amounts = [str(self.rng.randint(1, 100)) for j in range(payments)]
+            name = "sb%d" % self.rng.randint(1000000, 9999999)
+            fields = {
+                "event_block_height" : (self.height // cycle + 1 + i) * cycle,
+                "payment_addresses" : "|".join(addresses),
+                "payment_amounts" : "|".join(amounts),
+            }
+            self.add_govobj("trigger", name, fields, yes = self.rng.randint(0, 500))
+
+    def generate_masternodes(self, count, enabled_fraction = 0.9):
+        statuses = ["EXPIRED", "PRE_ENABLED", "NEW_START_REQUIRED"]
+        with self.lock:
+            for i in range(count):
+                vin = "%s-%d" % (self.random_hash(), self.rng.randint(0, 3))
+                status = "ENABLED" if self.rng.random() < enabled_fraction else self.rng.choice(statuses)
+                self.masternodes[vin] = "%18s %d %s %d %8d %d %6d %s" % (
+                    status, PROTOCOL_VERSION, make_address(self.rng, self.address_version()),
+                    int(time.time()), self.rng.randint(0, 10000000), 0, 0,
+                    "10.%d.%d.%d:9999" % (i >> 16 & 255, i >> 8 & 255, i & 255))
+            enabled = sorted(vin for vin, status in self.masternodes.items() if "ENABLED " in status)
+            if self.my_vin is None and len(enabled) > 0:
+                self.my_vin = enabled[0]
+
+    # ---- chain
+
+    def block_hash(self, height):
+        return sha256_hex("fakedashd-block-%d" % height)
+
+    def generate(self, count):
+        with self.lock:
+            hashes = []
+            for i in range(count):
+                self.height += 1
+                hashes.append(self.block_hash(self.height))
+            return hashes
+
+    # ---- rpc methods
+
+    def rpc_getinfo(self):
+        return {"version" : 120100, "protocolversion" : PROTOCOL_VERSION,
+                "blocks" : self.height, "testnet" : self.testnet}
+
+    def rpc_getblockcount(self):
+        return self.height
+
+    def rpc_getbestblockhash(self):
+        return self.block_hash(self.height)
+
+    def rpc_getblockchaininfo(self):
+        with self.lock:
+            return {"chain" : "test" if self.testnet else "main", "blocks" : self.height,
+                    "headers" : self.height, "bestblockhash" : self.block_hash(self.height)}
+
+    def rpc_getblockheader(self, block_hash, verbose = True):
+        with self.lock:
+            # recent blocks are asked for, search down from the tip
+            for height in range(self.height, -1, -1):
+                if self.block_hash(height) == block_hash:
+                    return {"hash" : block_hash, "height" : height,
+                            "confirmations" : self.height - height + 1}
+        raise RPCFault(-5, "Block not found")
+
+    def rpc_getblockhash(self, height):
+        height = int(height)
+        if height < 0 or height > self.height:
+            raise RPCFault(-8, "Block height out of range")
+        return self.block_hash(height)
+
+    def rpc_gettransaction(self, txid, include_watchonly = False):
+        with self.lock:
+            tx = self.txs.get(txid)
+            if tx is None:
+                raise RPCFault(-5, "Invalid or non-wallet transaction id")
+            confirmations = max(0, self.height - tx["height"] + 1)
+        result = {"txid" : txid, "amount" : -5.0, "fee" : -0.0001,
+                  "confirmations" : confirmations, "bcconfirmations" : confirmations}
+        if confirmations > 0:
+            result["blockhash"] = self.block_hash(tx["height"])
+        return result
+
+    def rpc_masternode(self, command, *args):
+        if command != "status":
+            raise RPCFault(-8, "Unknown masternode command: %s" % command)
+        if self.my_vin is None:
+            raise RPCFault(-1, "This is not a masternode")
+        txid, n = self.my_vin.rsplit("-", 1)
+        return {"vin" : "CTxIn(COutPoint(%s, %s), scriptSig=)" % (txid, n),
+                "service" : "127.0.0.1:9999", "status" : "Masternode successfully started"}
+
+    def rpc_masternodelist(self, mode = "status", *args):
+        if mode != "full":
+            raise RPCFault(-8, "Unsupported masternodelist mode: %s" % mode)
+        return self.masternodes
+
+    def rpc_gobject(self, command, *args):
+        handler = getattr(self, "gobject_" + command.replace("-", "_"), None)
+        if handler is None:
+            raise RPCFault(-8, "Unknown gobject command: %s" % command)
+        return handler(*args)
+
+    def gobject_list(self, *args):
+        return self.govobjs
+
+    def gobject_diff(self, *args):
+        """ objects added since the previous diff, like dashd this ignores vote changes """
+        with self.lock:
+            diff = dict((h, rec) for h, rec in self.govobjs.items() if h not in self.diff_seen)
+            self.diff_seen.update(diff.keys())
+        return diff
+
+    def gobject_prepare(self, parent_hash, revision, creation_time, name, data_hex):
+        fee_tx = self.random_hash()
+        with self.lock:
+            # the collateral is mined in the next block
+            self.txs[fee_tx] = {"height" : self.height + 1}
+        return fee_tx
+
+    def gobject_submit(self, parent_hash, revision, creation_time, name, data_hex, fee_tx = None):
+        try:
+            subtype, fields = json.loads(binascii.unhexlify(data_hex))[0]
+        except (TypeError, ValueError, IndexError):
+            raise RPCFault(-8, "Governance object is not valid - invalid data")
+        if subtype != "trigger":
+            if fee_tx not in self.txs:
+                raise RPCFault(-8, "Governance object is not valid - collateral not found")
+            if self.rpc_gettransaction(fee_tx)["confirmations"] < 6:
+                raise RPCFault(-8, "Governance object is not valid - collateral requires at least 6 confirmations")
+        return self.add_govobj(subtype, name, fields)
+
+    def gobject_vote_conf(self, obj_hash, signal, outcome):
+        with self.lock:
+            rec = self.govobjs.get(obj_hash)
+            if rec is None:
+                raise RPCFault(-8, "Governance object not found")
+            self.votes.append((obj_hash, signal, outcome))
+            if signal == "funding":
+                key = {"yes" : "YesCount", "no" : "NoCount"}.get(outcome, "AbstainCount")
+                rec[key] += 1
+                rec["AbsoluteYesCount"] = rec["YesCount"] - rec["NoCount"]
+                self.list_cache = None
+        return {"overall" : "Voted successfully 1 time(s) and failed 0 time(s).",
+                "detail" : {"dash.conf" : {"result" : "success"}}}
+
+    def rpc_generate(self, count = 1):
+        return self.generate(int(count))
+
+    def rpc_setlatency(self, milliseconds):
+        self.latency = float(milliseconds) / 1000.0
+        return self.latency
+
+    def dispatch(self, request):
+        method = request.get("method")
+        params = request.get("params") or []
+        handler = getattr(self, "rpc_" + str(method), None)
+        try:
+            if handler is None:
+                raise RPCFault(-32601, "Method not found")
+            try:
+                result = handler(*params)
+            except TypeError as e:
+                raise RPCFault(-1, "invalid parameters: %s" % e)
+            return {"result" : result, "error" : None, "id" : request.get("id")}
+        except RPCFault as e:
+            return {"result" : None, "error" : {"code" : e.code, "message" : e.message}, "id" : request.get("id")}
+
+    def list_response(self, request_id):
+        """ gobject list replies are big, so keep the encoded result until something changes """
+        with self.lock:
+            if self.list_cache is None:
+                self.list_cache = json.dumps(self.govobjs)
+            encoded = self.list_cache
+        return '{"result": %s, "error": null, "id": %s}' % (encoded, json.dumps(request_id))
+
+class RPCFault(Exception):
+
+    def __init__(self, code, message):
+        Exception.__init__(self, message)
+        self.code = code
+        self.message = message
+
+class FakeDashdHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        chain = self.server.chain
+        if self.headers.get("Authorization") != self.server.auth:
+            self.reply(401, "")
+            return
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if chain.latency > 0:
+            time.sleep(chain.latency)
+        try:
+            request = json.loads(body)
+        except ValueError:
+            self.reply(500, json.dumps({"result" : None, "error" : {"code" : -32700, "message" : "Parse error"}, "id" : None}))
+            return
+        if isinstance(request, list):
+            self.reply(200, json.dumps([chain.dispatch(r) for r in request]))
+        elif request.get("method") == "gobject" and request.get("params") == ["list"]:
+            self.reply(200, chain.list_response(request.get("id")))
+        else:
+            reply = chain.dispatch(request)
+            self.reply(200 if reply["error"] is None else 500, json.dumps(reply))
+
+    def reply(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            BaseHTTPServer.BaseHTTPRequestHandler.log_message(self, format, *args)
+
+class FakeDashdServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, chain, port = 0, rpcuser = "sentinel", rpcpassword = "sentinel", verbose = False):
+        BaseHTTPServer.HTTPServer.__init__(self, ("127.0.0.1", port), FakeDashdHandler)
+        self.chain = chain
+        self.rpcuser = rpcuser
+        self.rpcpassword = rpcpassword
+        self.auth = "Basic " + binascii.b2a_base64("%s:%s" % (rpcuser, rpcpassword)).strip()
+        self.verbose = verbose
+
+    def write_dash_conf(self, datadir):
+        if not os.path.exists(datadir):
+            os.makedirs(datadir)
+        with open(os.path.join(datadir, "dash.conf"), "w") as f:
+            f.write("rpcuser=%s\n" % self.rpcuser)
+            f.write("rpcpassword=%s\n" % self.rpcpassword)
+            f.write("rpcport=%d\n" % self.server_address[1])
+            f.write("testnet=%d\n" % (1 if self.chain.testnet else 0))
+
+    def start(self):
+        """ serve from a background thread, for use from benchmarks and tests """
+        thread = threading.Thread(target = self.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+def make_chain(proposals = 1000, triggers = 10, masternodes = 1000, seed = 0, testnet = True, latency = 0.0):
+    chain = FakeChain(seed = seed, testnet = testnet, latency = latency)
+    chain.generate_proposals(proposals)
+    chain.generate_triggers(triggers)
+    chain.generate_masternodes(masternodes)
+    return chain
+
+def main():
+    parser = argparse.ArgumentParser(description = "Fake dashd JSON-RPC server")
+    parser.add_argument("--port", type = int, default = 19998)
+    parser.add_argument("--rpcuser", default = "sentinel")
+    parser.add_argument("--rpcpassword", default = "sentinel")
+    parser.add_argument("--datadir", help = "write a dash.conf for this server into DATADIR")
+    parser.add_argument("--proposals", type = int, default = 1000)
+    parser.add_argument("--triggers", type = int, default = 10)
+    parser.add_argument("--masternodes", type = int, default = 1000)
+    parser.add_argument("--seed", type = int, default = 0)
+    parser.add_argument("--mainnet", action = "store_true")
+    parser.add_argument("--latency", type = float, default = 0.0, help = "reply latency in milliseconds")
+    parser.add_argument("--block-interval", type = float, default = 0.0, help = "mine a block every N seconds")
+    parser.add_argument("--verbose", action = "store_true")
+    args = parser.parse_args()
+
+    print "generating fixtures ..."
+    chain = make_chain(args.proposals, args.triggers, args.masternodes, args.seed,
+                       not args.mainnet, args.latency / 1000.0)
+    server = FakeDashdServer(chain, args.port, args.rpcuser, args.rpcpassword, args.verbose)
+    if args.datadir:
+        server.write_dash_conf(args.datadir)
+    print "fake dashd listening on 127.0.0.1:%d (%d objects, %d masternodes, height %d)" % (
+        server.server_address[1], len(chain.govobjs), len(chain.masternodes), chain.height)
+
+    if args.block_interval > 0:
+        server.start()
+        while True:
+            time.sleep(args.block_interval)
+            chain.generate(1)
+    else:
+        server.serve_forever()
+
+if __name__ == "__main__":
+    main()
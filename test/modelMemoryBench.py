@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+
+"""
+Memory footprint of the governance model classes
+
+Builds N proposals (100k by default) with the slot based Proposal class
+and with an equivalent dictionary based class, as the models were
+before, and prints the resident memory used per object.
+
+Field values are shared between objects so the numbers show the cost of
+the objects themselves rather than of their data.
+
+    python test/modelMemoryBench.py [-n 100000]
+"""
+
+import argparse
+import gc
+import os
+import resource
+import sys
+sys.path.append("lib")
+
+dir_path = os.path.dirname(os.path.realpath(__file__))
+
+sys.path.append( os.path.abspath( os.path.join( dir_path, ".." ) ) )
+
+from sentineld import Proposal
+
+class DictProposal:
+
+    """ dictionary based instance with the fields of Proposal """
+
+    def __init__(self):
+        for name in Proposal.fieldNames:
+            self.__dict__[name] = None
+
+def rss_bytes():
+    """ current resident set size """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except IOError:
+        # peak rather than current size, run one model per process for exact numbers
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def fill(obj, i):
+    obj.id = i
+    obj.governance_object_id = i
+    obj.object_hash = "00" * 32
+    obj.object_name = obj.proposal_name = "proposal"
+    obj.object_status = "NEW"
+    obj.object_origin = "REMOTE"
+    obj.payment_address = "yNaE8Le2MVwk1zpwuEKveTMCEQHVxdcfCS"
+    obj.payment_amount = 10
+    return obj
+
+def measure(name, make, n):
+    gc.collect()
+    before = rss_bytes()
+    objs = [fill(make(), i) for i in xrange(n)]
+    gc.collect()
+    used = rss_bytes() - before
+    sample = objs[0]
+    shallow = sys.getsizeof(sample)
+    # hasattr() would create the dictionary of an object with a __dict__ slot
+    if isinstance(sample, DictProposal):
+        shallow += sys.getsizeof(sample.__dict__)
+    print "%-8s %8d objects %10.1f MB %8.1f bytes/object (shallow %d bytes)" % (
+        name, n, used / 1e6, float(used) / n, shallow)
+    return objs
+
+def main():
+    parser = argparse.ArgumentParser(description = "per object memory of the model classes")
+    parser.add_argument("-n", type = int, default = 100000, help = "number of objects")
+    args = parser.parse_args()
+
+    # both sets are kept alive so the second doesn't reuse memory freed by the first
+    kept = []
+    kept.append(measure("dict", DictProposal, args.n))
+    kept.append(measure("slots", lambda: Proposal(None), args.n))
+    print "Proposal instances have a __dict__: %s" % (Proposal.__dictoffset__ != 0)
+
+if __name__ == '__main__':
+    main()
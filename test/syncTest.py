@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+
+"""
+Initial governance sync against test/fakedashd.py
+
+Syncs more objects than GOVERNANCE_STORE_BATCH_SIZE into the configured
+database, with the chain tip polled on every block cache lookup, so the
+budget checks of Proposal.isValid make rpc calls while gobject list is
+still streaming. Checks that every object was stored, and that a
+second sync finds nothing new.
+
+The fake server's dash.conf goes to a temporary directory. Run it
+against a scratch database:
+
+    python test/syncTest.py [--proposals 2500]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+dir_path = os.path.dirname(os.path.realpath(__file__))
+
+sys.path.append( os.path.abspath( os.path.join( dir_path, "..", "lib" ) ) )
+sys.path.append( dir_path )
+
+import config
+import fakedashd
+
+def stored_objects(libmysql, hashes):
+    """ { object_hash : is_valid } of the remote objects in hashes """
+    c = libmysql.db.cursor()
+    c.execute("select object_hash, is_valid from governance_object where object_origin = 'REMOTE'")
+    rows = c.fetchall()
+    c.close()
+    return dict((object_hash, is_valid) for object_hash, is_valid in rows if object_hash in hashes)
+
+def main():
+    parser = argparse.ArgumentParser(description = "initial governance sync against a fake dashd")
+    parser.add_argument("--proposals", type = int, default = 2500)
+    parser.add_argument("--triggers", type = int, default = 10)
+    args = parser.parse_args()
+
+    datadir = tempfile.mkdtemp()
+    try:
+        chain = fakedashd.make_chain(args.proposals, args.triggers, 100)
+        server = fakedashd.FakeDashdServer(chain)
+        server.write_dash_conf(datadir)
+        server.start()
+        config.datadir = datadir
+        config.dashd_transport = "rpc"
+
+        import libmysql
+        import sentineld
+        sentineld.DEBUG = False
+        sentineld.TESTNET = True
+        # poll the tip on every lookup
+        sentineld.BLOCK_CACHE.tipFile = None
+        sentineld.BLOCK_CACHE.pollSeconds = 0
+
+        task = sentineld.UpdateGovernanceTask()
+        task.run()
+        hashes = set(chain.govobjs.keys())
+        stored = stored_objects(libmysql, hashes)
+        valid = sum(1 for is_valid in stored.values() if is_valid)
+        print "stored %d of %d objects, %d valid" % (len(stored), len(hashes), valid)
+        assert len(stored) == len(hashes)
+        assert valid > sentineld.GOVERNANCE_STORE_BATCH_SIZE
+
+        task.run()
+        assert len(stored_objects(libmysql, hashes)) == len(hashes)
+        print "sync: ok"
+        server.shutdown()
+    finally:
+        shutil.rmtree(datadir)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())